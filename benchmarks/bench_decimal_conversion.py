@@ -0,0 +1,67 @@
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal, getcontext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+
+"""
+Benchmarks the float and Decimal conversion paths of models.Currency against each other, one at a time and in batches
+(the way bulk reconciliations convert), and against the naive Decimal code the exact path replaces (parsing the rate
+string and using the thread's context on every conversion).
+
+Run from the project root (the app logs to logs/app.log relative to the working directory):
+    python benchmarks/bench_decimal_conversion.py
+
+Constants:
+----------
+    AMOUNT_COUNT: how many USD amounts each path converts per run
+    REPEAT: how many times each path is timed (the best run is reported)
+"""
+
+AMOUNT_COUNT = 100_000
+REPEAT = 5
+
+
+def naive_decimal_convert(usd_amount, rate_string):
+    """
+    the straightforward Decimal conversion, with no pre-parsed rate or shared context
+    :param usd_amount: USD amount to convert
+    :param rate_string: the rate as the API sends it
+    :return: the converted amount, rounded to cents
+    """
+    return (Decimal(str(usd_amount)) * Decimal(rate_string)).quantize(Decimal('0.01'), context=getcontext())
+
+
+def main():
+    generator = random.Random(42)
+    rate_string = '0.944'
+    currency = models.Currency('Euro Zone', 'Euro', rate_string)
+    float_amounts = [round(generator.uniform(0.01, 100_000), 2) for _ in range(AMOUNT_COUNT)]
+    decimal_amounts = [Decimal(repr(amount)) for amount in float_amounts]
+    paths = {
+        'float': lambda: [currency.convert_amount(amount) for amount in float_amounts],
+        'float batch': lambda: currency.convert_many(float_amounts),
+        'decimal': lambda: [currency.convert_amount(amount, models.DECIMAL_MODE) for amount in decimal_amounts],
+        'decimal batch': lambda: currency.convert_many(decimal_amounts, models.DECIMAL_MODE),
+        'decimal (float in)': lambda: [currency.convert_amount(amount, models.DECIMAL_MODE)
+                                       for amount in float_amounts],
+        'naive decimal': lambda: [naive_decimal_convert(amount, rate_string) for amount in float_amounts],
+    }
+    print(f"{AMOUNT_COUNT} conversions per run, best of {REPEAT}")
+    baseline = None
+    for path_name, run in paths.items():
+        best = min(timeit.repeat(run, number=1, repeat=REPEAT))
+        baseline = baseline or best
+        print(f"{path_name:>18}: {best * 1000:8.2f} ms  {best / AMOUNT_COUNT * 1e9:7.0f} ns each"
+              f"  ({best / baseline:.1f}x float)")
+    mismatches = sum(round(currency.convert_amount(amount), 2) !=
+                     float(currency.convert_amount(amount, models.DECIMAL_MODE)) for amount in float_amounts)
+    print(f"float results that round to a different cent than the exact result: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dal
+from business import treasury_decoder
+
+"""
+Benchmarks the Treasury JSON decoders (see business.treasury_decoder) against each other on a 10k row response.
+
+Run from the project root (the app logs to logs/app.log relative to the working directory):
+    python benchmarks/bench_json_decoder.py            # uses benchmarks/data/rates_of_exchange_10k.json if recorded
+    python benchmarks/bench_json_decoder.py --record   # records a real 10k row response from the Treasury API first
+
+Without a recording a synthetic response shaped like the API's is generated instead.
+
+Constants:
+----------
+    RECORDING_PATH: where the recorded response is kept
+    ROW_COUNT: how many rows the benchmark response holds
+    REPEAT: how many times each decoder is timed (the best run is reported)
+"""
+
+RECORDING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'rates_of_exchange_10k.json')
+ROW_COUNT = 10_000
+REPEAT = 5
+
+
+def record_response():
+    """
+    Fetches a ROW_COUNT row page of the full rates of exchange history and saves its body to RECORDING_PATH
+    :return: the response body (bytes)
+    """
+    response = dal.fetch_treasury_data(page_size=ROW_COUNT)
+    response.raise_for_status()
+    os.makedirs(os.path.dirname(RECORDING_PATH), exist_ok=True)
+    with open(RECORDING_PATH, 'wb') as recording:
+        recording.write(response.content)
+    return response.content
+
+
+def synthesize_response():
+    """
+    Generates a response body shaped like the API's, for when nothing has been recorded
+    :return: the response body (bytes)
+    """
+    generator = random.Random(42)
+    rows = [{'record_date': f"{2001 + row_number // 680}-{(row_number // 170 % 4 + 1) * 3:02d}-30",
+             'country': f"Country {row_number % 170}",
+             'currency': f"Currency {row_number % 170}",
+             'exchange_rate': f"{generator.uniform(0.1, 20000):.3f}"}
+            for row_number in range(ROW_COUNT)]
+    meta = {'count': ROW_COUNT, 'total-count': ROW_COUNT, 'total-pages': 1}
+    return json.dumps({'data': rows, 'meta': meta}).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the Treasury JSON decoders on a 10k row response.')
+    parser.add_argument('--record', action='store_true', help='record a fresh response from the Treasury API first')
+    args = parser.parse_args()
+    if args.record:
+        body = record_response()
+        source = 'freshly recorded'
+    elif os.path.exists(RECORDING_PATH):
+        with open(RECORDING_PATH, 'rb') as recording:
+            body = recording.read()
+        source = 'recorded'
+    else:
+        body = synthesize_response()
+        source = 'synthetic'
+    row_count = len(json.loads(body)['data'])
+    print(f"{source} response: {row_count} rows, {len(body) / 1024:.0f} KiB")
+    baseline = None
+    for decoder_name in ['json'] + [name for name in treasury_decoder.available_json_decoders() if name != 'json']:
+        decode = treasury_decoder.get_json_decoder(decoder_name)
+        best = min(timeit.repeat(lambda: decode(body), number=1, repeat=REPEAT))
+        baseline = baseline or best
+        print(f"{decoder_name:>8}: {best * 1000:8.2f} ms  ({baseline / best:.1f}x the stdlib)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,10 @@
-from .currency_service import *
\ No newline at end of file
+from .currency_service import *
+from .async_currency_service import *
+from .stream_parser import *
+from .treasury_decoder import *
+from .conversion_service import *
+from .cross_rate_service import *
+from .history_service import *
+from .iso_codes import *
+from .lookup_service import *
+from .search_index import *
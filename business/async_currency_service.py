@@ -0,0 +1,110 @@
+import asyncio
+import dal
+from exceptions import BusinessLogicException, DalException
+from logging_config import get_logger
+from .currency_service import (find_last_quarter_date, find_fallback_start, handle_request_errors, select_quarter_rows,
+                               build_currency_dict, load_stored_rates, store_rates, peek_cached_currency_data,
+                               cache_currency_data, is_quarter_complete, QUARTER_PAGE_SIZE)
+
+"""
+This module contains asyncio versions of the currency service's retrieval methods, built on the DAL's async fetch
+methods. They share the threaded service's cache and the DAL's local rate store, so both halves of the app see the
+same rates.
+
+Methods:
+--------
+    get_currency_data_async(last_quarter_date=None, session=None):
+        Retrieves conversion rate data for a quarter without blocking the event loop.
+    get_quarters_async(quarter_dates, session=None):
+        Retrieves conversion rate data for several quarters concurrently.
+    read_page_rows(page):
+        Pulls the list of rate rows out of a decoded page from the async DAL.
+
+"""
+
+__all__ = ['get_currency_data_async', 'get_quarters_async', 'read_page_rows']
+
+logger = get_logger(__name__)
+_in_flight = {}  # (event loop, quarter date) -> Task shared by every coroutine waiting on that fetch
+
+
+async def get_currency_data_async(last_quarter_date=None, session=None):
+    """
+    Retrieves conversion rate data for a quarter without blocking the event loop: from the cache, then the local rate
+    store, then every page of the Treasury API fetched concurrently. Concurrent callers for the same quarter share one
+    fetch, and a quarter that's only partly published is served from the cache (shared with the threaded service)
+    until it's due a re-check for the missing currencies.
+    :param last_quarter_date: the quarter to retrieve (datetime.date object), defaults to find_last_quarter_date()
+    :param session: an aiohttp.ClientSession to reuse (see dal.create_async_session())
+    :return: currency_dict, the result of build_currency_dict()
+    """
+    if last_quarter_date is None:
+        last_quarter_date = find_last_quarter_date()
+    currency_dict = peek_cached_currency_data(last_quarter_date)
+    if currency_dict is not None:
+        return currency_dict
+    flight_key = (asyncio.get_running_loop(), last_quarter_date)
+    in_flight = _in_flight.get(flight_key)
+    if in_flight is None:
+        in_flight = asyncio.ensure_future(_fetch_currency_data_async(last_quarter_date, session))
+        _in_flight[flight_key] = in_flight
+        in_flight.add_done_callback(lambda _: _in_flight.pop(flight_key, None))
+    else:
+        logger.info(f"Joining the async fetch already in flight for {last_quarter_date}")
+    # shielded so one caller being cancelled doesn't cancel the fetch for everyone else
+    return await asyncio.shield(in_flight)
+
+
+async def get_quarters_async(quarter_dates, session=None):
+    """
+    Retrieves conversion rate data for several quarters concurrently.
+    :param quarter_dates: an iterable of quarter end dates (datetime.date objects)
+    :param session: an aiohttp.ClientSession to reuse (see dal.create_async_session())
+    :return: a dict of quarter date -> currency_dict
+    """
+    quarter_dates = list(quarter_dates)
+    results = await asyncio.gather(*(get_currency_data_async(quarter_date, session) for quarter_date in quarter_dates))
+    return dict(zip(quarter_dates, results))
+
+
+@handle_request_errors
+def read_page_rows(page):
+    """
+    Pulls the list of rate rows out of a decoded page from the async DAL.
+    :param page: decoded JSON body of a treasury API response
+    :return: a list of dicts, one per rate published by the Treasury.
+    """
+    return page['data']
+
+
+async def _fetch_currency_data_async(last_quarter_date, session):
+    """
+    Does the actual work for get_currency_data_async() (store first, then the API)
+    :param last_quarter_date: the quarter to retrieve (datetime.date object)
+    :param session: an aiohttp.ClientSession to reuse, or None
+    :return: currency_dict, the result of build_currency_dict()
+    """
+    try:
+        # sqlite is blocking, so the store is read and written from a worker thread
+        quarter_iso = last_quarter_date.isoformat()
+        stored_rows = select_quarter_rows(await asyncio.to_thread(load_stored_rates, last_quarter_date), quarter_iso)
+        currency_dict = build_currency_dict(stored_rows)
+        # only skip the API once every currency's rate for the quarter is stored, the rest may be out by now
+        if is_quarter_complete(currency_dict, last_quarter_date):
+            logger.info(f"Using stored rates for {last_quarter_date}, skipping the Treasury API")
+        else:
+            page_rows = []
+            fallback_start = find_fallback_start(last_quarter_date).isoformat()
+            async for page in dal.fetch_treasury_pages_async(quarter_iso, QUARTER_PAGE_SIZE, session=session,
+                                                             earliest_record_date=fallback_start):
+                page_rows.extend(read_page_rows(page))
+            # one selection pass over every page, a currency's rows for each quarter may be on different pages
+            quarter_rows = select_quarter_rows(page_rows, last_quarter_date)
+            currency_dict = build_currency_dict(quarter_rows)
+            if quarter_rows:
+                await asyncio.to_thread(store_rates, quarter_rows)
+        await asyncio.to_thread(cache_currency_data, last_quarter_date, currency_dict)
+        return currency_dict
+    except (DalException, BusinessLogicException):
+        # this will already be logged as well
+        raise BusinessLogicException
@@ -0,0 +1,103 @@
+import models
+from models.batch_conversion import np  # optional, None without NumPy
+from exceptions import BusinessLogicException
+from logging_config import get_logger
+
+"""
+This module contains methods for converting batches of USD amounts at once (for back office jobs), on top of the
+models layer's vectorized convert_batch (or its exact Decimal counterpart, multiply_amounts, with mode=DECIMAL_MODE).
+Formatting into display strings is optional and only done when asked for.
+
+Methods:
+--------
+    convert_amounts(usd_amounts, currencies, formatted=False, mode=FLOAT_MODE):
+        Converts many USD amounts into one currency, or each amount into its own currency.
+    convert_table_rows(usd_amounts, rate_table, row_numbers, formatted=False, mode=FLOAT_MODE):
+        Converts each USD amount at the rate in a given row of a RateTable (a vectorized gather with NumPy).
+
+"""
+
+__all__ = ['convert_amounts', 'convert_table_rows']
+
+logger = get_logger(__name__)
+
+
+def convert_amounts(usd_amounts, currencies, formatted=False, mode=models.FLOAT_MODE):
+    """
+    Converts many USD amounts into one currency, or each amount into its own currency.
+    :param usd_amounts: a sequence (or NumPy array) of USD amounts
+    :param currencies: a single Currency object, or a sequence of Currency objects (one per amount)
+    :param formatted: also build display strings ("$100.00 USD = 94.00 Euro") for every conversion
+    :param mode: models.FLOAT_MODE, or models.DECIMAL_MODE for exact amounts rounded to cents
+    :return: the converted amounts (NumPy array, array('d') without NumPy, a list of Decimals in DECIMAL_MODE), or
+             (converted amounts, strings) if formatted
+    """
+    try:
+        if isinstance(currencies, models.Currency):
+            converted = currencies.convert_many(usd_amounts, mode)
+            currency_names = currencies.currency_name
+        else:
+            converted = _convert_at_rates(usd_amounts, [_rate_of(currency, mode) for currency in currencies], mode)
+            currency_names = [currency.currency_name for currency in currencies]
+    except ValueError as value_error:
+        logger.error(f"Could not convert batch: {value_error}")
+        raise BusinessLogicException
+    logger.info(f"Converted a batch of {len(converted)} amounts")
+    if formatted:
+        return converted, models.format_conversions(usd_amounts, converted, currency_names)
+    return converted
+
+
+def convert_table_rows(usd_amounts, rate_table, row_numbers, formatted=False, mode=models.FLOAT_MODE):
+    """
+    Converts each USD amount at the rate in a given row of a RateTable. With NumPy the rates are gathered straight out
+    of the table's rate column, so there is no per amount Python work at all.
+    :param usd_amounts: a sequence (or NumPy array) of USD amounts
+    :param rate_table: a models.RateTable (e.g. the result of get_cached_currency_data())
+    :param row_numbers: a sequence (or NumPy array) of row numbers into rate_table, one per amount
+    :param formatted: also build display strings for every conversion
+    :param mode: models.FLOAT_MODE, or models.DECIMAL_MODE for exact amounts at the table's pre-quantized rates
+    :return: the converted amounts, or (converted amounts, strings) if formatted
+    """
+    try:
+        if mode == models.DECIMAL_MODE:
+            rates = [rate_table.decimal_rate_at(row_number) for row_number in row_numbers]
+        elif np is not None:
+            rates = np.frombuffer(rate_table.rate_column(), dtype=np.float64)[np.asarray(row_numbers, dtype=np.intp)]
+        else:
+            rate_column = rate_table.rate_column()
+            rates = [rate_column[row_number] for row_number in row_numbers]
+        converted = _convert_at_rates(usd_amounts, rates, mode)
+    except (ValueError, IndexError) as value_error:
+        logger.error(f"Could not convert batch: {value_error}")
+        raise BusinessLogicException
+    logger.info(f"Converted a batch of {len(converted)} amounts")
+    if formatted:
+        currency_names = [rate_table.currency_name_at(row_number) for row_number in row_numbers]
+        return converted, models.format_conversions(usd_amounts, converted, currency_names)
+    return converted
+
+
+def _rate_of(currency, mode):
+    """
+    The rate a Currency converts at in the given mode (its Decimal rate is only worked out if it's asked for)
+    :param currency: a models.Currency
+    :param mode: models.FLOAT_MODE or models.DECIMAL_MODE
+    :return: a float, or a pre-quantized Decimal in DECIMAL_MODE
+    """
+    return currency.decimal_rate if mode == models.DECIMAL_MODE else currency.conversion_rate
+
+
+def _convert_at_rates(usd_amounts, rates, mode):
+    """
+    Converts each USD amount at its rate (or every amount at the same rate) in the given mode
+    :param usd_amounts: a sequence (or NumPy array) of USD amounts
+    :param rates: a rate, or a sequence of rates the same length as usd_amounts (Decimals in DECIMAL_MODE)
+    :param mode: models.FLOAT_MODE or models.DECIMAL_MODE
+    :return: the converted amounts, see convert_amounts()
+    """
+    if mode == models.FLOAT_MODE:
+        return models.convert_batch(usd_amounts, rates)
+    if mode == models.DECIMAL_MODE:
+        return models.multiply_amounts(usd_amounts, rates)
+    raise ValueError(f"Unknown arithmetic mode: {mode}")
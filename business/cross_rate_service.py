@@ -0,0 +1,186 @@
+from array import array
+import models
+from models.batch_conversion import np  # optional, None without NumPy
+from exceptions import BusinessLogicException
+from logging_config import get_logger
+from .currency_service import memoize_per_rate_table
+
+"""
+This module contains a cross rate engine for converting between any two currencies the Treasury publishes rates for
+(EUR -> JPY, GBP -> INR, ...), not just out of USD. Every Treasury rate is "units of currency per US dollar", so the rate
+from currency i to currency j is rate_j / rate_i. Rather than working that out on every request, the whole N x N matrix
+is precomputed once per quarter load and a pair conversion is a single indexed multiply.
+
+Currencies are keyed by (country name, currency name) tuples (some countries publish more than one currency), and the
+US dollar itself is included as USD_KEY at a rate of 1.
+
+Methods:
+--------
+    get_cross_rates(rate_table=None) -> CrossRateMatrix:
+        Returns the cross rate matrix for a RateTable (the current quarter's by default), building it on first use.
+    convert_pair(amount, source, target, rate_table=None) -> float:
+        Converts an amount from one currency into another at the current quarter's cross rate.
+    clear_cross_rates():
+        Drops the cached matrix, the next get_cross_rates() call rebuilds it.
+    currency_key(currency) -> tuple:
+        The (country name, currency name) key of a Currency object (keys are passed through unchanged).
+
+Constants:
+----------
+    USD_KEY: the key of the US dollar in every matrix
+
+"""
+
+__all__ = ['USD_KEY', 'CrossRateMatrix', 'currency_key', 'get_cross_rates', 'convert_pair', 'clear_cross_rates']
+
+USD_KEY = ('United States', 'Dollar')
+logger = get_logger(__name__)
+
+
+class CrossRateMatrix:
+    __slots__ = ('_keys', '_index', '_matrix')
+
+    def __init__(self, keys, rates):
+        """
+        :param keys: (country name, currency name) tuples, one per currency
+        :param rates: units of each currency per US dollar, in the same order as keys
+        """
+        self._keys = list(keys)
+        self._index = {key: position for position, key in enumerate(self._keys)}
+        # matrix[i][j] is how many units of currency j one unit of currency i buys
+        if np is not None:
+            rate_vector = np.asarray(rates, dtype=np.float64)
+            self._matrix = rate_vector[np.newaxis, :] / rate_vector[:, np.newaxis]
+        else:
+            self._matrix = [array('d', (target_rate / source_rate for target_rate in rates)) for source_rate in rates]
+
+    @classmethod
+    def from_rate_table(cls, rate_table):
+        """
+        builds the matrix for every currency in a RateTable, plus the US dollar (a currency with more than one row
+        takes the rate in its last row, rates of zero or below are skipped since nothing can be converted out of them)
+        :param rate_table: a models.RateTable
+        :return: a CrossRateMatrix
+        """
+        rates_by_key = {USD_KEY: 1.0}
+        for country_name in rate_table:
+            for record_date, currency_name, rate in rate_table.rows(country_name):
+                if rate > 0:
+                    rates_by_key[(country_name, currency_name)] = rate
+                else:
+                    logger.warning(f"Leaving {country_name}-{currency_name} out of the cross rates, its rate is {rate}")
+        return cls(rates_by_key.keys(), rates_by_key.values())
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __str__(self):
+        return f"CrossRateMatrix: {len(self._keys)} x {len(self._keys)} currencies"
+
+    def __repr__(self):
+        return f"CrossRateMatrix: {len(self._keys)} x {len(self._keys)} currencies"
+
+    @property
+    def keys(self) -> list:
+        return list(self._keys)
+
+    def index_of(self, key) -> int:
+        """
+        the row/column of a currency in the matrix
+        :param key: a (country name, currency name) tuple
+        :return: the index
+        :raises KeyError: if the currency isn't in the matrix
+        """
+        return self._index[key]
+
+    def rate(self, source, target) -> float:
+        """
+        how many units of target one unit of source buys
+        :param source: (country name, currency name) tuple of the currency converted from
+        :param target: (country name, currency name) tuple of the currency converted to
+        :return: the cross rate
+        :raises KeyError: if either currency isn't in the matrix
+        """
+        return float(self._matrix[self._index[source]][self._index[target]])
+
+    def convert(self, amount: float, source, target) -> float:
+        """
+        converts an amount of source into target
+        :param amount: the amount in source
+        :param source: (country name, currency name) tuple of the currency converted from
+        :param target: (country name, currency name) tuple of the currency converted to
+        :return: the amount in target
+        :raises KeyError: if either currency isn't in the matrix
+        """
+        return amount * self._matrix[self._index[source]][self._index[target]]
+
+    def convert_many(self, amounts, source, target):
+        """
+        converts a batch of amounts of source into target (see models.convert_batch)
+        :param amounts: a sequence (or NumPy array) of amounts in source
+        :param source: (country name, currency name) tuple of the currency converted from
+        :param target: (country name, currency name) tuple of the currency converted to
+        :return: a NumPy array of converted amounts (an array('d') without NumPy)
+        :raises KeyError: if either currency isn't in the matrix
+        """
+        return models.convert_batch(amounts, self.rate(source, target))
+
+    def rates_from(self, source):
+        """
+        the rates from one currency into every currency, in the order of keys (a row of the matrix, not a copy)
+        :param source: (country name, currency name) tuple of the currency converted from
+        :return: a NumPy array (an array('d') without NumPy)
+        :raises KeyError: if the currency isn't in the matrix
+        """
+        return self._matrix[self._index[source]]
+
+
+def currency_key(currency) -> tuple:
+    """
+    The (country name, currency name) key of a Currency object, keys are passed through unchanged
+    :param currency: a models.Currency or a (country name, currency name) tuple
+    :return: the key
+    """
+    if isinstance(currency, models.Currency):
+        return currency.country_name, currency.currency_name
+    return tuple(currency)
+
+
+@memoize_per_rate_table
+def get_cross_rates(rate_table):
+    """
+    Returns the cross rate matrix for a RateTable, building it the first time it's asked for and reusing it until a
+    different table (i.e. another quarter's rates) comes along
+    :param rate_table: a models.RateTable, defaults to the current quarter's (get_cached_currency_data())
+    :return: a CrossRateMatrix
+    """
+    cross_rates = CrossRateMatrix.from_rate_table(rate_table)
+    logger.info(f"Built the cross rate matrix for {len(cross_rates)} currencies")
+    return cross_rates
+
+
+def convert_pair(amount: float, source, target, rate_table=None) -> float:
+    """
+    Converts an amount from one currency into another at the current quarter's cross rate
+    :param amount: the amount in source
+    :param source: a models.Currency or (country name, currency name) tuple to convert from
+    :param target: a models.Currency or (country name, currency name) tuple to convert to
+    :param rate_table: a models.RateTable, defaults to the current quarter's
+    :return: the amount in target
+    """
+    try:
+        return get_cross_rates(rate_table).convert(amount, currency_key(source), currency_key(target))
+    except KeyError as missing_currency:
+        logger.error(f"No rate published for {missing_currency}")
+        raise BusinessLogicException
+
+
+def clear_cross_rates():
+    """
+    Drops the cached matrix, the next get_cross_rates() call rebuilds it
+    :return: n/a
+    """
+    get_cross_rates.cache_clear()
@@ -1,10 +1,15 @@
 import dal
 import models
 import requests
+import concurrent.futures
 import functools
-from datetime import datetime, timedelta
+import itertools
+import threading
+from datetime import date, datetime, timedelta
 from exceptions import BusinessLogicException, DalException
 from logging_config import get_logger
+from .stream_parser import iter_treasury_records
+from .treasury_decoder import decode_treasury_page
 
 """
 This module contains method for retrieving data from the DAL and parsing it into a usable format for the GUI layer
@@ -13,72 +18,603 @@ Methods:
 --------
     find_last_quarter_date():
         Generates the last day of the last quarter. (so currently, 2023-09-30, but will work indefinitely.)
-    get_currency_data():
-        Retrieves conversion rate data response from the DAL
+    find_last_quarter_iso():
+        Generates the last day of the last quarter as an ISO string, the same format as the API's record dates.
+    find_quarter_end(day):
+        Finds the last day of the quarter a given date falls in.
+    find_previous_quarter_end(day):
+        Finds the last day of the quarter before the one a given date falls in.
+    find_fallback_start(last_quarter_date):
+        Finds the earliest record date a quarter's rates may fall back on while it isn't fully published.
+    as_iso_date(quarter_date):
+        Returns a quarter date as an ISO string, whether it was given as a datetime.date or already as a string
+    get_currency_data(refresh=False):
+        Retrieves conversion rate data for the last quarter, from the local rate store or the DAL's API call
+    is_serving_stale():
+        Whether the Treasury API is failing and the last good rates are being served instead
+    load_stored_rates(last_quarter_date):
+        Reads a quarter's rows (and the ones it may fall back on) from the DAL's local rate store
+    store_rates(quarter_rows):
+        Saves a quarter's rows to the DAL's local rate store
+    is_quarter_complete(currency_dict, last_quarter_date, grace_period=None):
+        Whether every currency has a rate published for the quarter itself (not an earlier one fallen back on)
+    get_cached_currency_data(grace_period=None, retry_interval=None):
+        Returns the cached currency_dict for the current quarter, populating it from the DAL on first use
+    refresh_currency_data(grace_period=None, retry_interval=None):
+        Deliberately invalidates the cached currency_dict for the current quarter and re-populates it from the DAL
+    clear_currency_cache():
+        Empties the cached currency_dict(s) without fetching anything
+    memoize_per_rate_table(build):
+        Decorator keeping what a function derives from a RateTable until a different table comes along
+    peek_cached_currency_data(last_quarter_date, retry_interval=None):
+        Looks a quarter up in the cache without ever fetching
+    cache_currency_data(last_quarter_date, currency_dict):
+        Puts a currency_dict fetched some other way into the cache
     handle_request_errors(func):
         Wrapper to handle errors for the below method (just wanted to implement one of these...)
     parse_treasury_response(response):
         Parses the conversion rate data from the API response into JSON, then into a dict of Currency objects.
+    parse_treasury_stream(response, last_quarter_date=None):
+        Parses the conversion rate data from the API response record by record as the body streams in.
+    read_treasury_rows(response):
+        Checks the status of the API response and pulls the list of rate rows out of its JSON.
+    select_quarter_rows(rows, last_quarter_date):
+        Picks each currency's latest row published on or before the last quarter, in a single pass
+    build_currency_dict(rows):
+        Builds a RateTable (country name -> list of Currency objects) out of rate rows
         
 Constants:
 ----------
-    APRIL: the numeric value for the month of (see name)
-    ONE_YEAR_IN_DAYS: the number of days in one year
-    JULY: the numeric value for the month of (see name)
-    OCTOBER: the numeric value for the month of (see name)
-    DECEMBER: the numeric value for the month of (see name)
+    MONTHS_PER_QUARTER: the number of months in a quarter
+    MONTHS_PER_YEAR: the number of months in a year
+    QUARTER_CACHE_SIZE: how many dates find_quarter_end()/find_previous_quarter_end() remember answers for
+    QUARTER_GRACE_PERIOD: how long after a quarter ends we keep serving the previous quarter while waiting on the new one
+    GRACE_RETRY_INTERVAL: how often to re-check for the new quarter's rates inside QUARTER_GRACE_PERIOD
+    FALLBACK_QUARTERS: how many quarters back a currency's rate may come from while its last quarter isn't published
+    QUARTER_PAGE_SIZE: how many rows to ask for per page when fetching a quarter along with the rates it may fall back
+        on (about 170 per quarter), enough for the whole range to come back in a single request
+    MIN_PROBE_DELAY: the fewest seconds to wait before probing a failing Treasury API (the breaker's reset timeout),
+        doubled after every probe that fails
+    MAX_PROBE_DELAY: the most seconds to wait between probes of a failing Treasury API
 """
 
-APRIL = 4
-ONE_YEAR_IN_DAYS = 365
-JULY = 7
-OCTOBER = 10
-DECEMBER = 12
+MONTHS_PER_QUARTER = 3
+MONTHS_PER_YEAR = 12
+QUARTER_CACHE_SIZE = 1024
+QUARTER_GRACE_PERIOD = timedelta(days=21)
+GRACE_RETRY_INTERVAL = timedelta(minutes=30)
+FALLBACK_QUARTERS = 1
+QUARTER_PAGE_SIZE = 1000
+MIN_PROBE_DELAY = dal.RESET_TIMEOUT
+MAX_PROBE_DELAY = 15 * 60
 logger = get_logger(__name__)
+_currency_cache = {}  # last quarter date -> currency_dict
+_grace_checked_at = {}  # last quarter date -> when we last found it unpublished
+_partial_cache = {}  # last quarter date -> currency_dict still falling back on earlier rates for some currencies
+_last_parsed = {}  # last quarter date -> currency_dict from the last successful API fetch (for 304 responses)
+_in_flight = {}  # (last quarter date, refresh) -> Future shared by every caller waiting on that fetch
+_in_flight_lock = threading.Lock()
+_last_good_currency_dict = None  # the last successful fetch, served while the API is down
+_serving_stale = False
+_probe_timer = None  # the pending recovery probe's threading.Timer, if there is one
+_probe_attempts = 0  # probes run since the API last answered with usable rates
+_stale_lock = threading.Lock()  # guards the four above
+_currency_cache_lock = threading.Lock()
 
 
 def find_last_quarter_date():
     """
-    Generates the last day of the previous quarter. (so currently, 2023-09-30, but will work indefinitely.)
+    Generates the last day of the previous quarter. (so currently, 2023-09-30, but will work indefinitely.) Memoized per
+    calendar day, so the hot parse path only pays for a date.today() call.
     :return: the last day of the previous quarter (datetime.date object)
     """
-    today = datetime.now()
-    logger.info(f"Grabbing today's date, {today.date()}")
-    if today.month < APRIL:
-        today -= timedelta(days=ONE_YEAR_IN_DAYS)  # years=1 is not an option?
-        last_quarter = datetime.strptime(f"{today.year}-12-31", '%Y-%m-%d').date()
-        logger.info(f"Established last quarter as {last_quarter}")
-        return last_quarter
-    elif today.month < JULY:
-        last_quarter = datetime.strptime(f"{today.year}-03-31", '%Y-%m-%d').date()
-        logger.info(f"Established last quarter as {last_quarter}")
-        return last_quarter
-    elif today.month < OCTOBER:
-        last_quarter = datetime.strptime(f"{today.year}-06-30", '%Y-%m-%d').date()
-        logger.info(f"Established last quarter as {last_quarter}")
-        return last_quarter
-    elif today.month <= DECEMBER:
-        last_quarter = datetime.strptime(f"{today.year}-09-30", '%Y-%m-%d').date()
-        logger.info(f"Established last quarter as {last_quarter}")
-        return last_quarter
-    else:
-        logger.error('Something went wrong trying to generate the previous quarter...')
-        raise BusinessLogicException
-
-
-def get_currency_data():
-    """
-    Retrieves conversion rate data response from the DAL
-    :return: currency_dict, the result of parse_treasury_response()
+    return _last_quarter_for_day(date.today())[0]
+
+
+def find_last_quarter_iso():
+    """
+    Generates the last day of the previous quarter as a canonical ISO string, the same format as the API's record dates
+    (memoized per calendar day along with find_last_quarter_date())
+    :return: the last day of the previous quarter, e.g. '2023-09-30'
+    """
+    return _last_quarter_for_day(date.today())[1]
+
+
+@functools.lru_cache(maxsize=QUARTER_CACHE_SIZE)
+def find_quarter_end(day):
+    """
+    Finds the last day of the quarter a given date falls in. (the day before the next quarter starts, so the month
+    lengths and leap years take care of themselves)
+    :param day: any datetime.date
+    :return: the last day of that date's quarter (datetime.date object)
+    """
+    next_quarter_month = (day.month - 1) // MONTHS_PER_QUARTER * MONTHS_PER_QUARTER + MONTHS_PER_QUARTER + 1
+    if next_quarter_month > MONTHS_PER_YEAR:
+        return date(day.year + 1, 1, 1) - timedelta(days=1)
+    return date(day.year, next_quarter_month, 1) - timedelta(days=1)
+
+
+@functools.lru_cache(maxsize=QUARTER_CACHE_SIZE)
+def find_previous_quarter_end(day):
+    """
+    Finds the last day of the quarter before the one a given date falls in.
+    :param day: any datetime.date
+    :return: the last day of the previous quarter (datetime.date object)
+    """
+    quarter_start_month = (day.month - 1) // MONTHS_PER_QUARTER * MONTHS_PER_QUARTER + 1
+    return date(day.year, quarter_start_month, 1) - timedelta(days=1)
+
+
+def find_fallback_start(last_quarter_date):
+    """
+    Finds the earliest record date a quarter's rates may fall back on while it isn't (fully) published yet, the end of
+    the quarter FALLBACK_QUARTERS quarters before it.
+    :param last_quarter_date: the result of find_last_quarter_date() (date or ISO string)
+    :return: the earliest record date to consider (datetime.date object)
+    """
+    fallback_start = date.fromisoformat(last_quarter_date) if isinstance(last_quarter_date, str) else last_quarter_date
+    for _ in range(FALLBACK_QUARTERS):
+        fallback_start = find_previous_quarter_end(fallback_start)
+    return fallback_start
+
+
+@functools.lru_cache(maxsize=1)
+def _last_quarter_for_day(today):
+    """
+    Works out (and logs) the previous quarter's last day for a given day, only once per day thanks to the cache.
+    :param today: today's date
+    :return: a tuple of the last quarter's datetime.date and its ISO string
+    """
+    logger.info(f"Grabbing today's date, {today}")
+    last_quarter = find_previous_quarter_end(today)
+    logger.info(f"Established last quarter as {last_quarter}")
+    return last_quarter, last_quarter.isoformat()
+
+
+def as_iso_date(quarter_date):
+    """
+    Returns a quarter date as an ISO string, whether it was given as a datetime.date or already as a string
+    :param quarter_date: a datetime.date object or an ISO formatted date string
+    :return: the ISO formatted date string
+    """
+    return quarter_date if isinstance(quarter_date, str) else quarter_date.isoformat()
+
+
+def get_currency_data(refresh=False):
+    """
+    Retrieves conversion rate data for the last quarter, from the local rate store if it has that quarter, otherwise
+    from the DAL's Treasury API call (in which case the quarter's rows are saved to the store for next time).
+    Concurrent callers asking for the same thing share a single fetch and all get the same currency_dict back.
+    :param refresh: skip the local rate store and ask the API, if we've parsed this quarter before the request is
+                    conditional and a 304 Not Modified just hands back that earlier parse
+    :return: currency_dict, the result of build_currency_dict()
+    """
+    last_quarter_date = find_last_quarter_date()
+    flight_key = (last_quarter_date, refresh)
+    with _in_flight_lock:
+        in_flight = _in_flight.get(flight_key)
+        is_leader = in_flight is None
+        if is_leader:
+            in_flight = concurrent.futures.Future()
+            _in_flight[flight_key] = in_flight
+    if not is_leader:
+        logger.info(f"Joining the fetch already in flight for {last_quarter_date}")
+        return in_flight.result()
+    try:
+        currency_dict = _fetch_currency_data(last_quarter_date, refresh)
+        in_flight.set_result(currency_dict)
+        return currency_dict
+    except BaseException as error:
+        in_flight.set_exception(error)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[flight_key]
+
+
+def _fetch_currency_data(last_quarter_date, refresh):
+    """
+    Does the actual work for get_currency_data() (store first, then the API), only ever run by one caller at a time
+    per quarter.
+    :param last_quarter_date: the result of find_last_quarter_date()
+    :param refresh: skip the local rate store and make a conditional request to the API
+    :return: currency_dict, the result of build_currency_dict()
     """
     try:
         # all of these calls should be logged elsewhere
-        response = dal.fetch_treasury_data()
-        currency_dict = parse_treasury_response(response)
+        quarter_iso = last_quarter_date.isoformat()
+        if not refresh:
+            stored_dict = build_currency_dict(select_quarter_rows(load_stored_rates(last_quarter_date), quarter_iso))
+            # only skip the API once every currency's rate for the quarter is stored, the rest may be out by now
+            if is_quarter_complete(stored_dict, last_quarter_date):
+                logger.info(f"Using stored rates for {last_quarter_date}, skipping the Treasury API")
+                _remember_good_data(stored_dict)
+                return stored_dict
+        # only ask for a 304 if there is a previous parse to fall back on
+        last_parsed = _last_parsed.get(last_quarter_date)
+        # a quarter is only a few pages, so they're read whole and decoded with the fastest decoder installed
+        # (streaming is kept for the full history, see history_service)
+        pages = dal.fetch_treasury_pages(quarter_iso, page_size=QUARTER_PAGE_SIZE, conditional=last_parsed is not None,
+                                         earliest_record_date=find_fallback_start(last_quarter_date).isoformat())
+        first_page = next(pages)
+        if first_page.status_code == dal.NOT_MODIFIED:
+            logger.info(f"Rates for {last_quarter_date} haven't changed, reusing the previous parse")
+            _remember_good_data(last_parsed)
+            return last_parsed
+        # every page goes through one selection pass, a currency's rows for each quarter may be on different pages
+        rows = (row for response in itertools.chain([first_page], pages) for row in read_treasury_rows(response))
+        quarter_rows = select_quarter_rows(rows, quarter_iso)
+        currency_dict = build_currency_dict(quarter_rows)
+        if quarter_rows:
+            _last_parsed[last_quarter_date] = currency_dict
+            store_rates(quarter_rows)
+            _remember_good_data(currency_dict)
         return currency_dict
     except (DalException, BusinessLogicException):
         # this will already be logged as well
-        raise BusinessLogicException
+        stale_dict = _serve_stale_data()
+        if stale_dict is None:
+            raise BusinessLogicException
+        return stale_dict
+
+
+def is_serving_stale():
+    """
+    Whether the Treasury API is currently failing and get_currency_data() is handing back the last good rates instead.
+    :return: True if the rates being served may be out of date
+    """
+    with _stale_lock:
+        return _serving_stale
+
+
+def _remember_good_data(currency_dict):
+    """
+    Keeps a successfully fetched currency_dict around to serve if the Treasury API goes down
+    :param currency_dict: the result of build_currency_dict()
+    :return: n/a
+    """
+    global _last_good_currency_dict, _serving_stale, _probe_attempts
+    with _stale_lock:
+        if _serving_stale:
+            logger.info('Treasury API is back, no longer serving stale rates')
+        _last_good_currency_dict = currency_dict
+        _serving_stale = False
+        _probe_attempts = 0
+
+
+def _serve_stale_data():
+    """
+    Hands back the last good currency_dict (flagged as stale) while the Treasury API is failing, and makes sure a
+    background probe is scheduled to find out when it recovers.
+    :return: the last good currency_dict, or None if there has never been one to fall back on
+    """
+    global _serving_stale
+    with _stale_lock:
+        if _last_good_currency_dict is None:
+            return None
+        if not _serving_stale:
+            logger.warning('Treasury API unavailable, serving the last good rates until it recovers')
+        _serving_stale = True
+        _schedule_recovery_probe()
+        return _last_good_currency_dict
+
+
+def _stale_currency_data():
+    """
+    The last good currency_dict, if the Treasury API is failing and that's what is being served
+    :return: the stale currency_dict, or None if the API isn't failing
+    """
+    with _stale_lock:
+        return _last_good_currency_dict if _serving_stale else None
+
+
+def _schedule_recovery_probe():
+    """
+    Starts a daemon timer that re-tries the Treasury API once the DAL's circuit breaker will let a probe through (and
+    no sooner than MIN_PROBE_DELAY, doubled for every failed probe up to MAX_PROBE_DELAY), unless one is already waiting.
+    (caller must hold _stale_lock)
+    :return: n/a
+    """
+    global _probe_timer
+    if _probe_timer is not None:
+        return
+    # back off exponentially, the DAL records a 4xx or a malformed body as a success so the breaker never opens
+    backoff = min(MIN_PROBE_DELAY * 2 ** _probe_attempts, MAX_PROBE_DELAY)
+    delay = max(dal.treasury_breaker.seconds_until_retry(), backoff)
+    timer = threading.Timer(delay, _run_recovery_probe)
+    timer.daemon = True
+    _probe_timer = timer
+    timer.start()
+    logger.info(f"Scheduled a recovery probe of the Treasury API in {delay:.0f} seconds")
+
+
+def _run_recovery_probe():
+    """
+    Runs in the background timer's thread: re-fetches the current quarter and, if the API answered, puts the fresh
+    rates in the cache. If it's still down the stale path schedules the next probe.
+    :return: n/a
+    """
+    global _probe_timer, _probe_attempts
+    with _stale_lock:
+        _probe_timer = None
+        _probe_attempts += 1
+    last_quarter_date = find_last_quarter_date()
+    try:
+        currency_dict = get_currency_data(refresh=True)
+    except BusinessLogicException:
+        logger.warning('Recovery probe failed')
+        return
+    if not is_serving_stale():
+        cache_currency_data(last_quarter_date, currency_dict)
+
+
+def load_stored_rates(last_quarter_date):
+    """
+    Reads a quarter's rows, and the earlier ones it may fall back on (see find_fallback_start()), from the DAL's local
+    rate store, a broken store just means going to the API instead.
+    :param last_quarter_date: the quarter to load (datetime.date object)
+    :return: a list of rate rows, empty if nothing is stored (or the store couldn't be read)
+    """
+    try:
+        return dal.load_rates(last_quarter_date.isoformat(), find_fallback_start(last_quarter_date).isoformat())
+    except DalException:
+        logger.warning('Could not read the local rate store, falling back on the Treasury API')
+        return []
+
+
+def store_rates(quarter_rows):
+    """
+    Saves a quarter's rows to the DAL's local rate store, failing to save only costs us a network call next start.
+    :param quarter_rows: rate rows to save, the result of select_quarter_rows()
+    :return: n/a
+    """
+    try:
+        dal.save_rates(quarter_rows)
+    except DalException:
+        logger.warning('Could not save rates to the local rate store')
+
+
+def get_cached_currency_data(grace_period=None, retry_interval=None):
+    """
+    Returns the cached currency_dict for the current quarter (keyed on find_last_quarter_date()), populating it from
+    the DAL on first use. Treasury rates are only published quarterly, so an entry never expires within its quarter.
+    Right after a quarter ends the new figures may not be published yet, so for grace_period days after the boundary
+    the previous quarter's rates are served and the new quarter is only re-checked once every retry_interval. While
+    the Treasury API is failing the last good rates are served as well, and only the background recovery probe (which
+    backs off between tries) asks the API again.
+    :param grace_period: timedelta after the quarter boundary to fall back on the previous quarter (QUARTER_GRACE_PERIOD)
+    :param retry_interval: timedelta between checks for unpublished quarter data (GRACE_RETRY_INTERVAL)
+    :return: currency_dict, the result of parse_treasury_response()
+    """
+    grace_period = QUARTER_GRACE_PERIOD if grace_period is None else grace_period
+    retry_interval = GRACE_RETRY_INTERVAL if retry_interval is None else retry_interval
+    last_quarter_date = find_last_quarter_date()
+    with _currency_cache_lock:
+        currency_dict = _peek_quarter(last_quarter_date, grace_period, retry_interval)
+    if currency_dict is not None:
+        return currency_dict
+    return _load_quarter_into_cache(last_quarter_date, grace_period)
+
+
+def refresh_currency_data(grace_period=None, retry_interval=None):
+    """
+    Deliberately invalidates the cached currency_dict for the current quarter and re-populates it from the DAL
+    :param grace_period: timedelta after the quarter boundary to fall back on the previous quarter (QUARTER_GRACE_PERIOD)
+    :param retry_interval: timedelta between checks for unpublished quarter data (GRACE_RETRY_INTERVAL)
+    :return: currency_dict, the freshly fetched result of parse_treasury_response()
+    """
+    grace_period = QUARTER_GRACE_PERIOD if grace_period is None else grace_period
+    last_quarter_date = find_last_quarter_date()
+    logger.info(f"Refreshing the currency cache for {last_quarter_date} from the Treasury API")
+    with _currency_cache_lock:
+        # forget when we last checked so the grace window can't swallow a deliberate refresh
+        _grace_checked_at.pop(last_quarter_date, None)
+    # the old entry is only replaced once the new data is in hand, so a failed refresh keeps the old rates around
+    return _load_quarter_into_cache(last_quarter_date, grace_period, force=True)
+
+
+def clear_currency_cache():
+    """
+    Empties the cached currency_dict(s) without fetching anything, the next get_cached_currency_data() call will refetch.
+    :return: n/a
+    """
+    with _currency_cache_lock:
+        logger.info('Clearing the currency cache')
+        _currency_cache.clear()
+        _partial_cache.clear()
+        _grace_checked_at.clear()
+
+
+def memoize_per_rate_table(build):
+    """
+    Decorator for functions that derive something from a RateTable (an index, a matrix...): the result is kept for the
+    last table it was built from and only rebuilt once a different table (i.e. another quarter's rates) comes along, so
+    it's built once per load. The table is replaced, not mutated, when a new quarter is loaded, so identity is enough.
+    The wrapped function's rate_table defaults to the current quarter's (get_cached_currency_data()), and its
+    cache_clear() drops what it's holding.
+    :param build: a function taking a RateTable and returning what's derived from it
+    :return: the wrapped function, taking rate_table=None
+    """
+    memo = None  # (rate table, what build() made of it)
+    lock = threading.Lock()
+
+    @functools.wraps(build)
+    def wrapper(rate_table=None):
+        nonlocal memo
+        rate_table = get_cached_currency_data() if rate_table is None else rate_table
+        with lock:
+            if memo is not None and memo[0] is rate_table:
+                return memo[1]
+            result = build(rate_table)
+            memo = (rate_table, result)
+            return result
+
+    def cache_clear():
+        nonlocal memo
+        with lock:
+            memo = None
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+
+def peek_cached_currency_data(last_quarter_date, retry_interval=None):
+    """
+    Looks a quarter up in the cache without ever fetching (for callers that can't block, like the asyncio service). A
+    quarter that was only partly published is handed back too, until it's due a re-check for the missing currencies.
+    :param last_quarter_date: the quarter to look up (datetime.date object)
+    :param retry_interval: timedelta between checks for unpublished quarter data (GRACE_RETRY_INTERVAL)
+    :return: the cached currency_dict, or None if that quarter isn't cached (or is due a re-check)
+    """
+    retry_interval = GRACE_RETRY_INTERVAL if retry_interval is None else retry_interval
+    with _currency_cache_lock:
+        if last_quarter_date in _currency_cache:
+            return _currency_cache[last_quarter_date]
+        if _is_due_a_check(last_quarter_date, retry_interval):
+            return None
+        return _partial_cache.get(last_quarter_date)
+
+
+def cache_currency_data(last_quarter_date, currency_dict):
+    """
+    Puts a currency_dict fetched some other way (e.g. by the asyncio service) into the cache. If some of its rates are
+    still earlier ones fallen back on, it's only kept until the quarter is due a re-check (see
+    peek_cached_currency_data()).
+    :param last_quarter_date: the quarter the rates are for (datetime.date object)
+    :param currency_dict: the result of build_currency_dict()
+    :return: n/a
+    """
+    with _currency_cache_lock:
+        if is_quarter_complete(currency_dict, last_quarter_date):
+            _currency_cache[last_quarter_date] = currency_dict
+            _grace_checked_at.pop(last_quarter_date, None)
+            _partial_cache.pop(last_quarter_date, None)
+        elif currency_dict:
+            _remember_partial_quarter(last_quarter_date, currency_dict)
+
+
+def _peek_quarter(last_quarter_date, grace_period, retry_interval):
+    """
+    Works out what get_cached_currency_data() can hand back without fetching, if anything (caller must hold
+    _currency_cache_lock)
+    :param last_quarter_date: the cache key, the result of find_last_quarter_date()
+    :param grace_period: timedelta after the quarter boundary to fall back on the previous quarter
+    :param retry_interval: timedelta between checks for unpublished quarter data
+    :return: the cached quarter, the last good rates while the API is failing, a partly published quarter (or the
+             previous quarter inside the grace window) until it's due a re-check, or None if it's time to fetch
+    """
+    if last_quarter_date in _currency_cache:
+        return _currency_cache[last_quarter_date]
+    stale_dict = _stale_currency_data()
+    if stale_dict is not None:
+        # the recovery probe caches the real thing once the API is back
+        return stale_dict
+    if _is_due_a_check(last_quarter_date, retry_interval):
+        return None
+    if last_quarter_date in _partial_cache:
+        return _partial_cache[last_quarter_date]
+    previous_quarter_date = max((key for key in _currency_cache if key < last_quarter_date), default=None)
+    if previous_quarter_date is not None and datetime.now().date() - last_quarter_date <= grace_period:
+        return _currency_cache[previous_quarter_date]
+    return None
+
+
+def _is_due_a_check(last_quarter_date, retry_interval):
+    """
+    Whether it's time to ask for a quarter that was found unpublished (or partly published) again (caller must hold
+    _currency_cache_lock)
+    :param last_quarter_date: the cache key, the result of find_last_quarter_date()
+    :param retry_interval: timedelta between checks for unpublished quarter data
+    :return: True if the quarter hasn't been checked within retry_interval
+    """
+    checked_at = _grace_checked_at.get(last_quarter_date)
+    return checked_at is None or datetime.now() - checked_at >= retry_interval
+
+
+def _remember_partial_quarter(last_quarter_date, currency_dict):
+    """
+    Keeps a quarter that some currencies are still missing from, to serve until it's due a re-check for the rest
+    (caller must hold _currency_cache_lock)
+    :param last_quarter_date: the cache key, the result of find_last_quarter_date()
+    :param currency_dict: the result of build_currency_dict(), some of its rates fallen back on earlier ones
+    :return: n/a
+    """
+    _partial_cache[last_quarter_date] = currency_dict
+    _grace_checked_at[last_quarter_date] = datetime.now()
+
+
+def _load_quarter_into_cache(last_quarter_date, grace_period, force=False):
+    """
+    Fetches the given quarter from the DAL and stores it in the cache. (called without _currency_cache_lock, the fetch
+    can take a while and callers asking at the same time share it anyway, see get_currency_data())
+    :param last_quarter_date: the cache key, the result of find_last_quarter_date()
+    :param grace_period: timedelta after the quarter boundary to fall back on the previous quarter
+    :param force: skip the local rate store and make a conditional request to the API
+    :return: currency_dict for last_quarter_date (some currencies may still be on earlier rates until it's complete),
+             or the previous quarter's inside the grace window
+    """
+    currency_dict = get_currency_data(refresh=force)
+    if is_serving_stale():
+        # served from memory from now on (see _peek_quarter()), until the recovery probe gets through
+        return currency_dict
+    with _currency_cache_lock:
+        return _store_quarter(last_quarter_date, currency_dict, grace_period)
+
+
+def _store_quarter(last_quarter_date, currency_dict, grace_period):
+    """
+    Puts a freshly fetched quarter in the cache, or remembers when it was found incomplete (caller must hold
+    _currency_cache_lock)
+    :param last_quarter_date: the cache key, the result of find_last_quarter_date()
+    :param currency_dict: the result of get_currency_data()
+    :param grace_period: timedelta after the quarter boundary to fall back on the previous quarter
+    :return: the currency_dict to hand back, see _load_quarter_into_cache()
+    """
+    previous_quarter_date = max((key for key in _currency_cache if key < last_quarter_date), default=None)
+    in_grace_period = datetime.now().date() - last_quarter_date <= grace_period
+    if is_quarter_complete(currency_dict, last_quarter_date, grace_period):
+        _currency_cache[last_quarter_date] = currency_dict
+        _grace_checked_at.pop(last_quarter_date, None)
+        _partial_cache.clear()
+        # older quarters are never asked for again once the current one is in
+        for key in [key for key in _currency_cache if key < last_quarter_date]:
+            del _currency_cache[key]
+        logger.info(f"Cached currency data for the quarter ending {last_quarter_date}")
+        return currency_dict
+    if last_quarter_date in _currency_cache:
+        # a forced refresh came back without the whole quarter, keep what we had
+        logger.warning(f"Refresh returned incomplete rates for {last_quarter_date}, keeping the cached ones")
+        return _currency_cache[last_quarter_date]
+    if currency_dict:
+        # some (or all) currencies fell back on earlier rates, serve them but only until the next re-check for the rest
+        logger.info(f"Rates for {last_quarter_date} not fully published yet, serving the latest published ones")
+        _remember_partial_quarter(last_quarter_date, currency_dict)
+        return currency_dict
+    if previous_quarter_date is not None and in_grace_period:
+        logger.info(f"Rates for {last_quarter_date} not published yet, serving {previous_quarter_date} instead")
+        _grace_checked_at[last_quarter_date] = datetime.now()
+        return _currency_cache[previous_quarter_date]
+    logger.warning(f"No rates found for {last_quarter_date}, nothing cached")
+    return currency_dict
+
+
+def is_quarter_complete(currency_dict, last_quarter_date, grace_period=None):
+    """
+    Whether every currency in a currency_dict has a rate published for the quarter itself, rather than an earlier one
+    the parser fell back on (see select_quarter_rows()). Once the grace period is over a quarter that has been
+    published, but not for every currency, counts as complete too: the ones still missing have stopped being published.
+    :param currency_dict: the result of build_currency_dict()
+    :param last_quarter_date: the quarter that was asked for (datetime.date object)
+    :param grace_period: timedelta after the quarter boundary to wait for missing currencies (QUARTER_GRACE_PERIOD)
+    :return: True if the rates can be kept for the rest of the quarter
+    """
+    if not currency_dict:
+        return False
+    quarter_iso = last_quarter_date.isoformat()
+    if currency_dict.earliest_record_date == quarter_iso:
+        return True
+    grace_period = QUARTER_GRACE_PERIOD if grace_period is None else grace_period
+    return (currency_dict.latest_record_date == quarter_iso
+            and datetime.now().date() - last_quarter_date > grace_period)
 
 
 def handle_request_errors(func):
@@ -94,7 +630,7 @@ def handle_request_errors(func):
         except requests.HTTPError as http_error:
             logger.error(f"Failed HTTP Response: {http_error}")
             raise BusinessLogicException
-        except requests.JSONDecodeError as json_error:
+        except (requests.JSONDecodeError, ValueError) as json_error:
             logger.error(f"Invalid format received: {json_error}")
             raise BusinessLogicException
         except (KeyError, IndexError) as dict_error:
@@ -110,32 +646,71 @@ def parse_treasury_response(response):
     :param response: response from treasury API call.
     :return: currency_dict, a dictionary of Currency objects.
     """
+    rows = read_treasury_rows(response)
+    # the DAL filters server side when asked to, but responses fetched without a record date still need selecting from
+    return build_currency_dict(select_quarter_rows(rows, find_last_quarter_date()))
+
+
+def parse_treasury_stream(response, last_quarter_date=None):
+    """
+    Parses the conversion rate data from the API response record by record as the body streams in (see
+    iter_treasury_records()), into a dict of Currency objects. Meant for big pages fetched with stream=True.
+    :param response: response from treasury API call.
+    :param last_quarter_date: the quarter to keep (date or ISO string), defaults to find_last_quarter_date()
+    :return: currency_dict, a dictionary of Currency objects.
+    """
+    target_date = find_last_quarter_iso() if last_quarter_date is None else as_iso_date(last_quarter_date)
+    return build_currency_dict(select_quarter_rows(iter_treasury_records(response), target_date))
+
+
+@handle_request_errors
+def read_treasury_rows(response):
+    """
+    Checks the status of the API response and pulls the list of rate rows out of its JSON. (decoded with the fastest
+    decoder installed, see treasury_decoder)
+    :param response: response from treasury API call.
+    :return: a list of dicts, one per rate published by the Treasury.
+    """
     logger.info("Attempting to parse response from Treasury API")
     response.raise_for_status()
-    response_json = response.json()
-    last_quarter_date = find_last_quarter_date()
-    currency_dict = {}
-    extra_currency_counter = 0  # for testing
-    for result in response_json['data']:
-        # grab variables
-        record_date = datetime.strptime(result['record_date'], '%Y-%m-%d').date()
-        country_name = result['country']
-        currency_name = result['currency']
-        exchange_rate = result['exchange_rate']
-        # check if the record date = the last date of the previous quarter (these figures are published quarterly)
-        if record_date == last_quarter_date:
-            # check if the country is already in the dict (there will be a few countries with multiple currencies)
-            if country_name in currency_dict.keys():
-                new_currency = models.Currency(country_name, currency_name, exchange_rate)
-                # if it is, add the new currency
-                extra_currency_counter += 1  # for testing
-                currency_dict[country_name].append(new_currency)
-            else:
-                # if not, create a new dict key and add the Currency object to it.
-                new_country = models.Currency(country_name, currency_name, exchange_rate)
-                currency_dict[country_name] = [new_country]
-    logger.info("Successfully parsed API response into currency_dict")
-    logger.info(f"Parsed {(len(currency_dict.values())) + extra_currency_counter} currencies from {len(currency_dict.keys())} countries")
-    return currency_dict
+    response_json = decode_treasury_page(response.content)
+    return response_json['data']
 
 
+@handle_request_errors
+def select_quarter_rows(rows, last_quarter_date):
+    """
+    Picks each currency's latest row published on or before the last quarter (and no earlier than
+    find_fallback_start()), in a single pass over rows in any order. Right after a quarter ends the Treasury may not
+    have published it yet (or not for every currency), this way the previous rates fill in rather than going missing.
+    :param rows: rate rows from the Treasury API (any iterable, e.g. a stream of records)
+    :param last_quarter_date: the result of find_last_quarter_date() (or find_last_quarter_iso())
+    :return: a list with one row per (country, currency)
+    """
+    # the API's record dates are already ISO strings, so compare them as strings instead of parsing every one
+    target_date = as_iso_date(last_quarter_date)
+    earliest_date = find_fallback_start(last_quarter_date).isoformat()
+    latest_rows = {}
+    for row in rows:
+        record_date = row['record_date']
+        if earliest_date <= record_date <= target_date:
+            key = (row['country'], row['currency'])
+            kept_row = latest_rows.get(key)
+            if kept_row is None or record_date > kept_row['record_date']:
+                latest_rows[key] = row
+    return list(latest_rows.values())
+
+
+@handle_request_errors
+def build_currency_dict(rows):
+    """
+    Builds a RateTable (a read-only mapping of country name -> list of Currency objects, stored column by column) out
+    of rate rows (from the API or the local rate store)
+    :param rows: rate rows with record_date, country, currency and exchange_rate keys
+    :return: currency_dict, a models.RateTable
+    """
+    # there will be a few countries with multiple currencies, the table groups those rows together
+    currency_dict = models.RateTable.from_records(rows)
+    logger.info("Successfully parsed rate rows into currency_dict")
+    logger.info(f"Parsed {currency_dict.row_count} currencies from {len(currency_dict)} countries")
+    return currency_dict
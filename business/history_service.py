@@ -0,0 +1,100 @@
+import threading
+import dal
+import models
+from exceptions import BusinessLogicException, DalException
+from logging_config import get_logger
+from .currency_service import find_last_quarter_date, as_iso_date
+from .stream_parser import iter_treasury_records
+
+"""
+This module contains methods for converting amounts as of any past date (for audits), using the whole history of
+Treasury rates rather than just the last quarter. The history is fetched once through the DAL's paginated fetch and
+kept in memory as a models.RateHistory, and is refetched when a new quarter comes around.
+
+Methods:
+--------
+    get_rate_history(refresh=False) -> models.RateHistory:
+        Returns the cached rate history, fetching it from the Treasury API on first use (or each new quarter).
+    load_rate_history() -> models.RateHistory:
+        Fetches every published rate from the Treasury API and builds a RateHistory out of them.
+    convert_on(usd_amount, country_name, currency_name, day) -> str:
+        Converts a USD amount at the rate that was in effect on a given date.
+    clear_rate_history():
+        Drops the cached history, the next get_rate_history() call refetches it.
+
+Constants:
+----------
+    HISTORY_PAGE_SIZE: how many rows to ask for per page when fetching the whole history
+
+"""
+
+__all__ = ['HISTORY_PAGE_SIZE', 'load_rate_history', 'get_rate_history', 'convert_on', 'clear_rate_history']
+
+HISTORY_PAGE_SIZE = 1000
+logger = get_logger(__name__)
+# (the quarter the history was fetched in, the history)
+_rate_history = None
+_rate_history_lock = threading.Lock()
+
+
+def load_rate_history():
+    """
+    Fetches every published rate from the Treasury API (all pages, streamed) and builds a RateHistory out of them
+    :return: a models.RateHistory
+    """
+    try:
+        records = (record for response in dal.fetch_treasury_pages(None, page_size=HISTORY_PAGE_SIZE, stream=True)
+                   for record in iter_treasury_records(response))
+        rate_history = models.RateHistory.from_records(records)
+    except DalException:
+        # this will already be logged
+        raise BusinessLogicException
+    except (KeyError, ValueError) as record_error:
+        logger.error(f"Invalid rate record received: {record_error}")
+        raise BusinessLogicException
+    logger.info(f"Loaded {rate_history.record_count} historical rates for {len(rate_history)} currencies")
+    return rate_history
+
+
+def get_rate_history(refresh=False):
+    """
+    Returns the cached rate history, fetching it on first use. A new quarter's rates are added to the history when
+    they're published, so the cached copy is refetched once find_last_quarter_date() moves on.
+    :param refresh: refetch the history even if the cached copy is from this quarter
+    :return: a models.RateHistory
+    """
+    global _rate_history
+    last_quarter_date = find_last_quarter_date()
+    with _rate_history_lock:
+        if not refresh and _rate_history is not None and _rate_history[0] == last_quarter_date:
+            return _rate_history[1]
+        rate_history = load_rate_history()
+        _rate_history = (last_quarter_date, rate_history)
+        return rate_history
+
+
+def convert_on(usd_amount: float, country_name: str, currency_name: str, day) -> str:
+    """
+    Converts a USD amount at the rate that was in effect on a given date (the latest rate published on or before it)
+    :param usd_amount: USD amount to convert
+    :param country_name: country name, as the Treasury publishes it
+    :param currency_name: currency name, as the Treasury publishes it
+    :param day: a date, or an ISO formatted date string
+    :return: A string e.g. "$100.00 USD = 94.00 Euro"
+    """
+    try:
+        currency = get_rate_history().currency_on((country_name, currency_name), as_iso_date(day))
+    except KeyError:
+        logger.error(f"No {country_name}-{currency_name} rate published on or before {day}")
+        raise BusinessLogicException
+    return currency.convert(usd_amount)
+
+
+def clear_rate_history():
+    """
+    Drops the cached history without fetching anything, the next get_rate_history() call will refetch it
+    :return: n/a
+    """
+    global _rate_history
+    with _rate_history_lock:
+        _rate_history = None
@@ -0,0 +1,110 @@
+import re
+
+"""
+This module contains a static mapping from the Treasury's (country, currency) names to ISO 4217 currency codes. The
+Treasury API doesn't publish codes, so they're worked out from the names: a few (country, currency) pairs are spelled
+out (countries with more than one currency, or renamed currencies), currencies shared between countries (the Euro, the
+East Caribbean Dollar) are mapped by name, and everything else by country.
+
+Methods:
+--------
+    find_iso_code(country_name, currency_name) -> str:
+        Looks up the ISO 4217 code for a Treasury (country, currency) pair.
+    normalise_key(name) -> str:
+        Normalises a country, currency or code for case-insensitive lookups.
+
+"""
+
+__all__ = ['normalise_key', 'find_iso_code']
+
+_PUNCTUATION = re.compile(r"[.,'’()]")
+_SEPARATORS = re.compile(r'[\s\-/]+')
+_LONE_LETTER = re.compile(r'\b(\w) (?=\w)')
+
+
+def normalise_key(name):
+    """
+    Normalises a country, currency or code for case-insensitive lookups ("Cote D'Ivoire", "cote d ivoire" and
+    "COTE DIVOIRE" all come out the same, as do "Trinidad & Tobago" and "trinidad and tobago")
+    :param name: the name to normalise
+    :return: the lookup key
+    """
+    name = _PUNCTUATION.sub('', name.casefold().replace('&', ' and '))
+    name = _SEPARATORS.sub(' ', name).strip()
+    # a letter standing on its own was split off the next word (d'ivoire typed as "d ivoire"), put it back
+    return _LONE_LETTER.sub(r'\1', name)
+
+
+# (country, currency) pairs a country or currency name alone can't settle
+_PAIR_CODES = {
+    ('cuba', 'chavito'): 'CUC',
+    ('cuba', 'peso'): 'CUP',
+    ('venezuela', 'bolivar fuerte'): 'VEF',
+    ('venezuela', 'bolivar soberano'): 'VES',
+    ('zambia', 'kwacha'): 'ZMK',
+    ('zambia', 'new kwacha'): 'ZMW',
+    ('zimbabwe', 'rtgs'): 'ZWL',
+    ('zimbabwe', 'gold'): 'ZWG',
+    ('croatia', 'kuna'): 'HRK',
+    ('sierra leone', 'old leone'): 'SLL',
+    ('panama', 'dolares'): 'USD',
+    ('ecuador', 'dolares'): 'USD',
+}
+
+# currencies shared between countries
+_CURRENCY_CODES = {
+    'euro': 'EUR',
+    'east caribbean dollar': 'XCD',
+}
+
+# every other currency goes by the country publishing it
+_COUNTRY_CODES = {
+    'afghanistan': 'AFN', 'albania': 'ALL', 'algeria': 'DZD', 'angola': 'AOA', 'antigua and barbuda': 'XCD',
+    'argentina': 'ARS', 'armenia': 'AMD', 'aruba': 'AWG', 'australia': 'AUD', 'azerbaijan': 'AZN', 'bahamas': 'BSD',
+    'bahrain': 'BHD', 'bangladesh': 'BDT', 'barbados': 'BBD', 'belarus': 'BYN', 'belize': 'BZD', 'benin': 'XOF',
+    'bermuda': 'BMD', 'bhutan': 'BTN', 'bolivia': 'BOB', 'bosnia': 'BAM', 'bosnia hercegovina': 'BAM',
+    'bosnia and herzegovina': 'BAM', 'botswana': 'BWP', 'brazil': 'BRL', 'brunei': 'BND', 'bulgaria': 'BGN',
+    'burkina faso': 'XOF', 'burma': 'MMK', 'myanmar': 'MMK', 'burundi': 'BIF', 'cambodia': 'KHR', 'cameroon': 'XAF',
+    'canada': 'CAD', 'cape verde': 'CVE', 'cabo verde': 'CVE', 'cayman islands': 'KYD',
+    'central african republic': 'XAF', 'chad': 'XAF', 'chile': 'CLP', 'china': 'CNY', 'colombia': 'COP',
+    'comoros': 'KMF', 'congo': 'XAF', 'republic of congo': 'XAF', 'democratic republic of congo': 'CDF',
+    'dem rep of congo': 'CDF', 'costa rica': 'CRC', 'cote divoire': 'XOF', 'ivory coast': 'XOF', 'croatia': 'EUR',
+    'cuba': 'CUP', 'czech republic': 'CZK', 'czechia': 'CZK', 'denmark': 'DKK', 'djibouti': 'DJF', 'dominica': 'XCD',
+    'dominican republic': 'DOP', 'east timor': 'USD', 'timor leste': 'USD', 'ecuador': 'USD', 'egypt': 'EGP',
+    'el salvador': 'USD', 'equatorial guinea': 'XAF', 'eritrea': 'ERN', 'eswatini': 'SZL', 'swaziland': 'SZL',
+    'ethiopia': 'ETB', 'fiji': 'FJD', 'gabon': 'XAF', 'gambia': 'GMD', 'georgia': 'GEL', 'ghana': 'GHS',
+    'grenada': 'XCD', 'guatemala': 'GTQ', 'guinea': 'GNF', 'guinea bissau': 'XOF', 'guyana': 'GYD', 'haiti': 'HTG',
+    'honduras': 'HNL', 'hong kong': 'HKD', 'hungary': 'HUF', 'iceland': 'ISK', 'india': 'INR', 'indonesia': 'IDR',
+    'iran': 'IRR', 'iraq': 'IQD', 'israel': 'ILS', 'jamaica': 'JMD', 'japan': 'JPY', 'jordan': 'JOD',
+    'kazakhstan': 'KZT', 'kenya': 'KES', 'korea': 'KRW', 'south korea': 'KRW', 'kuwait': 'KWD', 'kyrgyzstan': 'KGS',
+    'laos': 'LAK', 'lebanon': 'LBP', 'lesotho': 'LSL', 'liberia': 'LRD', 'libya': 'LYD', 'macao': 'MOP',
+    'macau': 'MOP', 'madagascar': 'MGA', 'malawi': 'MWK', 'malaysia': 'MYR', 'maldives': 'MVR', 'mali': 'XOF',
+    'marshall islands': 'USD', 'mauritania': 'MRU', 'mauritius': 'MUR', 'mexico': 'MXN', 'micronesia': 'USD',
+    'moldova': 'MDL', 'mongolia': 'MNT', 'morocco': 'MAD', 'mozambique': 'MZN', 'namibia': 'NAD', 'nepal': 'NPR',
+    'netherlands antilles': 'ANG', 'new zealand': 'NZD', 'nicaragua': 'NIO', 'niger': 'XOF', 'nigeria': 'NGN',
+    'north macedonia': 'MKD', 'republic of north macedonia': 'MKD', 'macedonia': 'MKD', 'norway': 'NOK',
+    'oman': 'OMR', 'pakistan': 'PKR', 'palau': 'USD', 'panama': 'PAB', 'papua new guinea': 'PGK', 'paraguay': 'PYG',
+    'peru': 'PEN', 'philippines': 'PHP', 'poland': 'PLN', 'qatar': 'QAR', 'romania': 'RON', 'russia': 'RUB',
+    'rwanda': 'RWF', 'samoa': 'WST', 'western samoa': 'WST', 'sao tome and principe': 'STN', 'saudi arabia': 'SAR',
+    'senegal': 'XOF', 'serbia': 'RSD', 'seychelles': 'SCR', 'sierra leone': 'SLE', 'singapore': 'SGD',
+    'solomon islands': 'SBD', 'somali': 'SOS', 'somalia': 'SOS', 'south africa': 'ZAR', 'south sudan': 'SSP',
+    'sri lanka': 'LKR', 'st kitts and nevis': 'XCD', 'st lucia': 'XCD', 'st vincent and grenadines': 'XCD',
+    'st vincent and the grenadines': 'XCD', 'sudan': 'SDG', 'suriname': 'SRD', 'sweden': 'SEK',
+    'switzerland': 'CHF', 'syria': 'SYP', 'taiwan': 'TWD', 'tajikistan': 'TJS', 'tanzania': 'TZS', 'thailand': 'THB',
+    'togo': 'XOF', 'tonga': 'TOP', 'trinidad and tobago': 'TTD', 'tunisia': 'TND', 'turkey': 'TRY', 'turkiye': 'TRY',
+    'turkmenistan': 'TMT', 'uganda': 'UGX', 'ukraine': 'UAH', 'united arab emirates': 'AED',
+    'united kingdom': 'GBP', 'united states': 'USD', 'uruguay': 'UYU', 'uzbekistan': 'UZS', 'vanuatu': 'VUV',
+    'venezuela': 'VES', 'vietnam': 'VND', 'yemen': 'YER', 'zambia': 'ZMW', 'zimbabwe': 'ZWL',
+}
+
+
+def find_iso_code(country_name, currency_name):
+    """
+    Looks up the ISO 4217 code for a Treasury (country, currency) pair
+    :param country_name: country name, as the Treasury publishes it
+    :param currency_name: currency name, as the Treasury publishes it
+    :return: the three letter code, or None if the pair isn't known
+    """
+    country_key, currency_key = normalise_key(country_name), normalise_key(currency_name)
+    return (_PAIR_CODES.get((country_key, currency_key)) or _CURRENCY_CODES.get(currency_key)
+            or _COUNTRY_CODES.get(country_key))
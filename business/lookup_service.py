@@ -0,0 +1,162 @@
+from exceptions import BusinessLogicException
+from logging_config import get_logger
+from .currency_service import memoize_per_rate_table
+from .iso_codes import find_iso_code, normalise_key
+
+"""
+This module contains secondary indexes over a quarter's rates, so a currency can be found by its ISO 4217 code, its
+currency name or its country in O(1) instead of scanning every list in currency_dict. The indexes are built once per
+load (per RateTable) and their keys are normalised (see iso_codes.normalise_key()), so lookups ignore case, spacing and
+punctuation.
+
+A code or a currency name can belong to several countries (EUR, XOF, "Dollar"...), so every index maps a key to a
+tuple of Currency objects, in the order the table lists them.
+
+Methods:
+--------
+    get_currency_index(rate_table=None) -> CurrencyIndex:
+        Returns the indexes for a RateTable (the current quarter's by default), building them on first use.
+    find_currency_by_code(code, rate_table=None) -> models.Currency:
+        Finds the current quarter's rate for an ISO 4217 code.
+    find_currencies(query, rate_table=None) -> tuple:
+        Finds currencies by ISO code, currency name or country, whichever matches first.
+    clear_currency_index():
+        Drops the cached indexes, the next get_currency_index() call rebuilds them.
+
+"""
+
+__all__ = ['CurrencyIndex', 'get_currency_index', 'find_currency_by_code', 'find_currencies', 'clear_currency_index']
+
+logger = get_logger(__name__)
+
+
+class CurrencyIndex:
+    __slots__ = ('_by_code', '_by_currency_name', '_by_country', '_codes')
+
+    def __init__(self, currencies):
+        """
+        :param currencies: an iterable of Currency objects
+        """
+        by_code, by_currency_name, by_country, codes = {}, {}, {}, {}
+        for currency in currencies:
+            code = find_iso_code(currency.country_name, currency.currency_name)
+            if code is None:
+                logger.warning(f"No ISO code known for {currency.country_name}-{currency.currency_name}")
+            else:
+                by_code.setdefault(normalise_key(code), []).append(currency)
+                codes[currency] = code
+            by_currency_name.setdefault(normalise_key(currency.currency_name), []).append(currency)
+            by_country.setdefault(normalise_key(currency.country_name), []).append(currency)
+        # tuples, so callers can't change the index by changing a result
+        self._by_code = {key: tuple(matches) for key, matches in by_code.items()}
+        self._by_currency_name = {key: tuple(matches) for key, matches in by_currency_name.items()}
+        self._by_country = {key: tuple(matches) for key, matches in by_country.items()}
+        self._codes = codes
+
+    @classmethod
+    def from_rate_table(cls, rate_table):
+        """
+        builds the indexes for every currency in a RateTable
+        :param rate_table: a models.RateTable
+        :return: a CurrencyIndex
+        """
+        return cls(currency for country_name in rate_table for currency in rate_table[country_name])
+
+    def __str__(self):
+        return (f"CurrencyIndex: {len(self._by_code)} codes, {len(self._by_currency_name)} currency names, "
+                f"{len(self._by_country)} countries")
+
+    def __repr__(self):
+        return (f"CurrencyIndex: {len(self._by_code)} codes, {len(self._by_currency_name)} currency names, "
+                f"{len(self._by_country)} countries")
+
+    @property
+    def codes(self) -> list:
+        return sorted(set(self._codes.values()))
+
+    def by_code(self, code: str) -> tuple:
+        """
+        the currencies with an ISO 4217 code (case-insensitive)
+        :param code: e.g. 'EUR' or 'eur'
+        :return: a tuple of Currency objects, empty if nothing matches
+        """
+        return self._by_code.get(normalise_key(code), ())
+
+    def by_currency_name(self, currency_name: str) -> tuple:
+        """
+        the currencies with a currency name (case-insensitive)
+        :param currency_name: e.g. 'Euro'
+        :return: a tuple of Currency objects, empty if nothing matches
+        """
+        return self._by_currency_name.get(normalise_key(currency_name), ())
+
+    def by_country(self, country_name: str) -> tuple:
+        """
+        the currencies a country publishes (case-insensitive)
+        :param country_name: e.g. 'euro zone'
+        :return: a tuple of Currency objects, empty if nothing matches
+        """
+        return self._by_country.get(normalise_key(country_name), ())
+
+    def find(self, query: str) -> tuple:
+        """
+        the currencies matching an ISO code, currency name or country, tried in that order
+        :param query: a code, currency name or country name
+        :return: a tuple of Currency objects, empty if nothing matches
+        """
+        key = normalise_key(query)
+        return self._by_code.get(key) or self._by_currency_name.get(key) or self._by_country.get(key, ())
+
+    def iso_code_of(self, currency) -> str:
+        """
+        the ISO 4217 code of an indexed Currency object
+        :param currency: a Currency object from the indexed table
+        :return: the code, or None if it isn't known
+        """
+        return self._codes.get(currency)
+
+
+@memoize_per_rate_table
+def get_currency_index(rate_table):
+    """
+    Returns the indexes for a RateTable, building them the first time they're asked for and reusing them until a
+    different table (i.e. another quarter's rates) comes along
+    :param rate_table: a models.RateTable, defaults to the current quarter's (get_cached_currency_data())
+    :return: a CurrencyIndex
+    """
+    currency_index = CurrencyIndex.from_rate_table(rate_table)
+    logger.info(f"Built {currency_index}")
+    return currency_index
+
+
+def find_currency_by_code(code, rate_table=None):
+    """
+    Finds the current quarter's rate for an ISO 4217 code (every country sharing a code, e.g. the Euro countries, is
+    published at the same rate, so the first one is as good as any)
+    :param code: e.g. 'EUR' (case-insensitive)
+    :param rate_table: a models.RateTable, defaults to the current quarter's
+    :return: a models.Currency
+    """
+    matches = get_currency_index(rate_table).by_code(code)
+    if not matches:
+        logger.error(f"No rate published for currency code {code}")
+        raise BusinessLogicException
+    return matches[0]
+
+
+def find_currencies(query, rate_table=None):
+    """
+    Finds currencies by ISO code, currency name or country, whichever matches first (case-insensitive)
+    :param query: a code, currency name or country name
+    :param rate_table: a models.RateTable, defaults to the current quarter's
+    :return: a tuple of models.Currency objects, empty if nothing matches
+    """
+    return get_currency_index(rate_table).find(query)
+
+
+def clear_currency_index():
+    """
+    Drops the cached indexes, the next get_currency_index() call rebuilds them
+    :return: n/a
+    """
+    get_currency_index.cache_clear()
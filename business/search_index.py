@@ -0,0 +1,158 @@
+from collections import Counter
+from logging_config import get_logger
+from .currency_service import memoize_per_rate_table
+from .iso_codes import find_iso_code, normalise_key
+
+"""
+This module contains an in-memory search index over country and currency names, for filtering the GUI's currency
+dropdown as the user types. Every prefix of every word is mapped straight to its matches (a prefix trie flattened into
+one dict, with each node's matches worked out ahead of time), so a keystroke costs one dict lookup per word typed no
+matter how many entries there are. Queries that aren't a prefix of anything (typos, the middle of a word) fall back on a
+trigram index.
+
+Entries are the values the dropdown shows (country names), searchable by their own words and by the names and ISO codes
+of the currencies they publish, so typing "yen" or "jpy" finds Japan.
+
+Methods:
+--------
+    get_search_index(rate_table=None) -> SearchIndex:
+        Returns the search index for a RateTable (the current quarter's by default), building it on first use.
+    search_currencies(query, rate_table=None) -> list:
+        Finds the countries matching what the user has typed so far.
+    clear_search_index():
+        Drops the cached index, the next get_search_index() call rebuilds it.
+
+Constants:
+----------
+    NGRAM_SIZE: how many characters make up each n-gram of the fuzzy fallback
+    MIN_NGRAM_SHARE: the fraction of a query's n-grams an entry has to share to count as a fuzzy match
+
+"""
+
+__all__ = ['NGRAM_SIZE', 'MIN_NGRAM_SHARE', 'SearchIndex', 'get_search_index', 'search_currencies', 'clear_search_index']
+
+NGRAM_SIZE = 3
+MIN_NGRAM_SHARE = 0.5
+logger = get_logger(__name__)
+
+
+def _ngrams(text):
+    # padded with spaces so the start and end of each word count, short words still get one n-gram
+    padded = f" {text} "
+    return {padded[start:start + NGRAM_SIZE] for start in range(max(len(padded) - NGRAM_SIZE + 1, 1))}
+
+
+class SearchIndex:
+    __slots__ = ('_values', '_prefixes', '_ngrams')
+
+    def __init__(self, entries):
+        """
+        :param entries: an iterable of (value, search texts) pairs, in the order results should be listed
+        """
+        self._values = []
+        prefixes, ngrams = {}, {}
+        for position, (value, texts) in enumerate(entries):
+            self._values.append(value)
+            for text in texts:
+                key = normalise_key(text)
+                for word in key.split():
+                    for length in range(1, len(word) + 1):
+                        prefixes.setdefault(word[:length], set()).add(position)
+                for ngram in _ngrams(key):
+                    ngrams.setdefault(ngram, set()).add(position)
+        # each prefix's matches are stored already sorted, so a lookup hands back a ready made list
+        self._prefixes = {prefix: tuple(sorted(positions)) for prefix, positions in prefixes.items()}
+        self._ngrams = ngrams
+
+    @classmethod
+    def from_rate_table(cls, rate_table):
+        """
+        builds an index of the table's countries, searchable by country name, currency names and ISO codes
+        :param rate_table: a models.RateTable
+        :return: a SearchIndex
+        """
+        entries = []
+        for country_name in rate_table:
+            texts = [country_name]
+            for record_date, currency_name, rate in rate_table.rows(country_name):
+                texts.append(currency_name)
+                iso_code = find_iso_code(country_name, currency_name)
+                if iso_code is not None:
+                    texts.append(iso_code)
+            entries.append((country_name, texts))
+        return cls(entries)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __str__(self):
+        return f"SearchIndex: {len(self._values)} entries, {len(self._prefixes)} prefixes"
+
+    def __repr__(self):
+        return f"SearchIndex: {len(self._values)} entries, {len(self._prefixes)} prefixes"
+
+    def search(self, query: str) -> list:
+        """
+        the entries matching a query, each word of which has to start a word of the entry (in any order, ignoring case
+        and punctuation), falling back on trigram matching if nothing does
+        :param query: what the user has typed so far
+        :return: a list of matching values in index order (every value for a blank query)
+        """
+        words = normalise_key(query).split()
+        if not words:
+            return list(self._values)
+        matches = self._prefixes.get(words[0], ())
+        for word in words[1:]:
+            if not matches:
+                break
+            word_matches = set(self._prefixes.get(word, ()))
+            matches = [position for position in matches if position in word_matches]
+        if matches:
+            return [self._values[position] for position in matches]
+        return self.fuzzy_search(query)
+
+    def fuzzy_search(self, query: str) -> list:
+        """
+        the entries sharing at least MIN_NGRAM_SHARE of a query's trigrams, best matches first
+        :param query: what the user has typed so far
+        :return: a list of matching values
+        """
+        query_ngrams = _ngrams(normalise_key(query))
+        scores = Counter()
+        for ngram in query_ngrams:
+            scores.update(self._ngrams.get(ngram, ()))
+        threshold = len(query_ngrams) * MIN_NGRAM_SHARE
+        ranked = sorted((position for position, score in scores.items() if score >= threshold),
+                        key=lambda position: (-scores[position], position))
+        return [self._values[position] for position in ranked]
+
+
+@memoize_per_rate_table
+def get_search_index(rate_table):
+    """
+    Returns the search index for a RateTable, building it the first time it's asked for and reusing it until a
+    different table (i.e. another quarter's rates) comes along
+    :param rate_table: a models.RateTable, defaults to the current quarter's (get_cached_currency_data())
+    :return: a SearchIndex
+    """
+    search_index = SearchIndex.from_rate_table(rate_table)
+    logger.info(f"Built {search_index}")
+    return search_index
+
+
+def search_currencies(query, rate_table=None):
+    """
+    Finds the countries matching what the user has typed so far (by country, currency name or ISO code)
+    :param query: the text typed into the dropdown
+    :param rate_table: a models.RateTable, defaults to the current quarter's
+    :return: a list of country names
+    """
+    return get_search_index(rate_table).search(query)
+
+
+def clear_search_index():
+    """
+    Drops the cached index, the next get_search_index() call rebuilds it
+    :return: n/a
+    """
+    get_search_index.cache_clear()
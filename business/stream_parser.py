@@ -0,0 +1,158 @@
+import codecs
+import json
+import re
+import requests
+from exceptions import BusinessLogicException
+from logging_config import get_logger
+
+"""
+This module contains methods for parsing a Treasury API response incrementally, one rate record at a time, as its body
+streams in. Only the record currently being decoded (plus whatever is left of the current chunk) is held in memory, so
+peak memory stays flat no matter how big the page is, and parsing overlaps with the download.
+
+Methods:
+--------
+    iter_treasury_records(response, chunk_size=STREAM_CHUNK_SIZE):
+        Yields the rate records from a Treasury API response's data array as the body streams in.
+    iter_json_array(chunks, key=DATA_KEY):
+        Yields the items of the array stored under a top level key of a JSON object, given the document in pieces.
+
+Constants:
+----------
+    STREAM_CHUNK_SIZE: how many bytes to read off the response at a time
+    DATA_KEY: the top level key the Treasury API puts its records under
+    WHITESPACE: matches the whitespace between JSON tokens
+    SEPARATORS: the characters that can follow a complete value inside an object or array
+
+"""
+
+__all__ = ['STREAM_CHUNK_SIZE', 'DATA_KEY', 'WHITESPACE', 'SEPARATORS', 'iter_treasury_records', 'iter_json_array']
+
+STREAM_CHUNK_SIZE = 64 * 1024
+DATA_KEY = 'data'
+WHITESPACE = re.compile(r'\s*')
+SEPARATORS = ',:]}'
+logger = get_logger(__name__)
+_decoder = json.JSONDecoder()
+
+
+def iter_treasury_records(response, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the rate records from a Treasury API response's data array as the body streams in. (works best on a
+    response fetched with stream=True, but an already read response is just walked chunk by chunk)
+    :param response: response from treasury API call.
+    :param chunk_size: how many bytes to read off the response at a time
+    :return: a generator of dicts, one per rate published by the Treasury.
+    """
+    logger.info("Attempting to stream parse response from Treasury API")
+    try:
+        response.raise_for_status()
+        utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+        chunks = (utf8_decoder.decode(chunk) for chunk in response.iter_content(chunk_size))
+        record_count = 0
+        for record in iter_json_array(chunks):
+            record_count += 1
+            yield record
+        logger.info(f"Stream parsed {record_count} records from the Treasury API")
+    except requests.HTTPError as http_error:
+        logger.error(f"Failed HTTP Response: {http_error}")
+        raise BusinessLogicException
+    except requests.RequestException as stream_error:
+        logger.error(f"Response stream failed: {stream_error}")
+        raise BusinessLogicException
+    except ValueError as json_error:
+        logger.error(f"Invalid format received: {json_error}")
+        raise BusinessLogicException
+
+
+def iter_json_array(chunks, key=DATA_KEY):
+    """
+    Yields the items of the array stored under a top level key of a JSON object, given the document in pieces. Each
+    item is decoded as soon as the character after it arrives and dropped from the buffer once it's yielded. (the
+    other top level values are decoded and skipped, so an array under the same key further down, e.g. in meta, is
+    never mistaken for it)
+    :param chunks: an iterable of str pieces of the JSON document
+    :param key: the key of the array to walk
+    :return: a generator of the array's decoded items
+    :raises ValueError: if the document ends before the array does, isn't valid JSON or has no such array
+    """
+    chunks = iter(chunks)
+    buffer = ''
+    position = 0
+
+    def read_more():
+        nonlocal buffer, position
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"Response ended before the end of the '{key}' array")
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def next_character():
+        # skips whitespace, reading more of the document until there's something else to look at
+        nonlocal position
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position < len(buffer):
+                return buffer[position]
+            read_more()
+
+    def decode_value():
+        nonlocal position
+        while True:
+            next_character()
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # most likely the value just isn't all here yet, read more and try again
+                end = None
+            # a value cut short by the end of the buffer can still decode (a number split across two chunks decodes
+            # fine as its first half, 1.5 as 1), so only trust it once the separator after it has arrived
+            if end is not None:
+                after = WHITESPACE.match(buffer, end).end()
+                if after < len(buffer) and buffer[after] in SEPARATORS:
+                    position = end
+                    return value
+            read_more()
+
+    if next_character() != '{':
+        raise ValueError('Expected the response to be a JSON object')
+    position += 1
+    # walk the top level keys, skipping every value until the one we want
+    while True:
+        if next_character() == '}':
+            raise ValueError(f"No '{key}' array found in the response")
+        name = decode_value()
+        if next_character() != ':':
+            raise ValueError(f"Expected a ':' after the key {name!r}")
+        position += 1
+        if name == key:
+            break
+        decode_value()
+        if next_character() == ',':
+            position += 1
+    if next_character() != '[':
+        raise ValueError(f"'{key}' in the response isn't an array")
+    position += 1
+    # the hot loop, once per record, so the usual case (a whole item followed by its separator) is spelled out here
+    # rather than going through next_character()/decode_value()
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            read_more()
+            continue
+        separator = buffer[position]
+        if separator == ']':
+            return
+        if separator == ',':
+            position += 1
+            continue
+        try:
+            item, end = _decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+        if end is not None and end < len(buffer) and buffer[end] in SEPARATORS:
+            position = end
+            yield item
+        else:
+            yield decode_value()
@@ -1 +1,4 @@
 from .dal import *
+from .rate_store import *
+from .async_dal import *
+from .circuit_breaker import *
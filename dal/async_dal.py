@@ -0,0 +1,200 @@
+import asyncio
+import time
+import requests
+from exceptions import DalException, CircuitOpenException
+from logging_config import get_logger
+from .dal import (BASE_URL, ENDPOINT, DESIRED_PAGE_NUMBER, DESIRED_PAGE_SIZE, MAX_PAGE_WORKERS, POOL_SIZE,
+                  ACCEPT_ENCODING, CONNECT_TIMEOUT, READ_TIMEOUT, MAX_RETRIES, SERVER_ERROR, build_query_params,
+                  backoff_delay, fetch_treasury_data, treasury_breaker)
+
+try:
+    import aiohttp
+except ImportError:  # optional, without it the async functions run the threaded fetch on the default executor
+    aiohttp = None
+
+"""
+This module contains asyncio versions of the DAL's fetch methods, so many pages (or quarters) can be fetched
+concurrently on one event loop instead of tying up a thread per request. They use aiohttp when it's installed and fall
+back on running the regular threaded fetch in the event loop's default executor when it isn't.
+
+Unlike the threaded versions these return the decoded JSON body rather than the response, since an aiohttp response
+can't be read once its session is closed.
+
+Methods:
+--------
+    create_async_session(pool_size=POOL_SIZE):
+        Creates an aiohttp.ClientSession set up like the threaded DAL's pooled session.
+    fetch_treasury_data_async(record_date=None, page_number=DESIRED_PAGE_NUMBER, page_size=DESIRED_PAGE_SIZE,
+                              session=None, earliest_record_date=None):
+        Fetches one page from the Treasury api and returns its decoded JSON.
+    fetch_treasury_pages_async(record_date=None, page_size=DESIRED_PAGE_SIZE, max_concurrency=MAX_PAGE_WORKERS,
+                               session=None, earliest_record_date=None):
+        Fetches every page of a Treasury query concurrently, yielding each page's decoded JSON as it arrives.
+
+"""
+
+__all__ = ['create_async_session', 'fetch_treasury_data_async', 'fetch_treasury_pages_async']
+
+logger = get_logger(__name__)
+
+
+def create_async_session(pool_size=POOL_SIZE):
+    """
+    Creates an aiohttp.ClientSession set up like the threaded DAL's pooled session. (must be called from inside a
+    running event loop, and closed by the caller, ideally with 'async with')
+    :param pool_size: how many connections the session keeps open
+    :return: an aiohttp.ClientSession, or None when aiohttp isn't installed
+    """
+    if aiohttp is None:
+        return None
+    connector = aiohttp.TCPConnector(limit=pool_size)
+    timeout = aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers={'Accept-Encoding': ACCEPT_ENCODING})
+
+
+async def fetch_treasury_data_async(record_date=None, page_number=DESIRED_PAGE_NUMBER, page_size=DESIRED_PAGE_SIZE,
+                                    session=None, earliest_record_date=None):
+    """
+    Fetches one page from the Treasury api and returns its decoded JSON.
+    :param record_date: ISO formatted date string, if given the API only sends back rates published on that date
+    :param page_number: which page of results to fetch (1 based)
+    :param page_size: how many rows to put on a page
+    :param session: an aiohttp.ClientSession to reuse (see create_async_session()), a short lived one is made if None
+    :param earliest_record_date: ISO formatted date string, if given along with record_date the API sends back every
+                                 rate published from this date up to record_date instead
+    :return: the decoded JSON body of the response (a dict with data and meta keys)
+    """
+    # both paths go through the DAL's treasury_breaker, the threaded one inside fetch_treasury_data()
+    if aiohttp is None:
+        response = await asyncio.to_thread(fetch_treasury_data, record_date, page_number, page_size,
+                                           earliest_record_date=earliest_record_date)
+        return _decode_response(response)
+    if not treasury_breaker.allow_request():
+        logger.warning(f"Not calling the treasury API, circuit open for another "
+                       f"{treasury_breaker.seconds_until_retry():.0f} seconds")
+        raise CircuitOpenException
+    if session is None:
+        async with create_async_session() as new_session:
+            return await _get_page(new_session, record_date, page_number, page_size, earliest_record_date)
+    return await _get_page(session, record_date, page_number, page_size, earliest_record_date)
+
+
+async def fetch_treasury_pages_async(record_date=None, page_size=DESIRED_PAGE_SIZE, max_concurrency=MAX_PAGE_WORKERS,
+                                     session=None, earliest_record_date=None):
+    """
+    Fetches every page of a Treasury query. The first page is fetched on its own to learn meta.total-pages, the rest
+    are fetched concurrently (at most max_concurrency at a time) and yielded in whatever order they arrive.
+    :param record_date: ISO formatted date string, if given only rates published on that date (None for all history)
+    :param page_size: how many rows to put on a page
+    :param max_concurrency: the most page requests to have in flight at once
+    :param session: an aiohttp.ClientSession to reuse (see create_async_session()), a short lived one is made if None
+    :param earliest_record_date: ISO formatted date string, if given along with record_date every rate published from
+                                 this date up to record_date
+    :return: an async generator of decoded JSON bodies, one per page
+    """
+    if session is None and aiohttp is not None:
+        async with create_async_session() as new_session:
+            async for page in fetch_treasury_pages_async(record_date, page_size, max_concurrency, new_session,
+                                                         earliest_record_date):
+                yield page
+        return
+    first_page = await fetch_treasury_data_async(record_date, DESIRED_PAGE_NUMBER, page_size, session,
+                                                 earliest_record_date)
+    yield first_page
+    try:
+        total_pages = int(first_page['meta']['total-pages'])
+    except (ValueError, KeyError, TypeError) as meta_error:
+        logger.warning(f"Could not read the page count, assuming one page: {meta_error}")
+        return
+    if total_pages <= DESIRED_PAGE_NUMBER:
+        return
+    logger.info(f"Fetching {total_pages - DESIRED_PAGE_NUMBER} more pages, at most {max_concurrency} at a time")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_page(page_number):
+        async with semaphore:
+            return await fetch_treasury_data_async(record_date, page_number, page_size, session, earliest_record_date)
+
+    tasks = [asyncio.ensure_future(fetch_page(page_number))
+             for page_number in range(DESIRED_PAGE_NUMBER + 1, total_pages + 1)]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            yield await next_page
+    finally:
+        # if the caller stops early (or a page fails) don't leave the other requests running
+        for task in tasks:
+            task.cancel()
+
+
+async def _get_page(session, record_date, page_number, page_size, earliest_record_date=None):
+    """
+    Requests one page with aiohttp, also checks for several errors. Retried the same way as the threaded DAL's
+    get_with_retries().
+    :param session: the aiohttp.ClientSession to make the request with
+    :param record_date: ISO formatted date string or None
+    :param page_number: which page of results to fetch (1 based)
+    :param page_size: how many rows to put on a page
+    :param earliest_record_date: ISO formatted date string or None
+    :return: the decoded JSON body of the response
+    """
+    record_dates = f"{earliest_record_date} to {record_date}" if earliest_record_date else record_date or 'any'
+    logger.info(f"Fetching page {page_number} of currency data from the treasury API asynchronously "
+                f"(record date: {record_dates})")
+    url = f"{BASE_URL}{ENDPOINT}"
+    params = build_query_params(record_date, page_number, page_size, earliest_record_date)
+    for attempt in range(1, MAX_RETRIES + 2):
+        started = time.perf_counter()
+        try:
+            async with session.get(url, params=params) as response:
+                elapsed = (time.perf_counter() - started) * 1000
+                logger.info(f"Attempt {attempt} returned {response.status} in {elapsed:.0f} ms")
+                if response.status < SERVER_ERROR or attempt > MAX_RETRIES:
+                    if response.status >= SERVER_ERROR:
+                        treasury_breaker.record_failure()
+                    else:
+                        treasury_breaker.record_success()
+                    response.raise_for_status()
+                    page = await response.json()
+                    logger.info('Successfully fetched currency data in async DAL')
+                    return page
+        except asyncio.TimeoutError as time_out:
+            logger.warning(f"Attempt {attempt} timed out after {(time.perf_counter() - started) * 1000:.0f} ms")
+            if attempt > MAX_RETRIES:
+                logger.error(f"Request timed out: {time_out}")
+                treasury_breaker.record_failure()
+                raise DalException
+        except aiohttp.ClientResponseError as http_error:
+            logger.error(f"Failed HTTP Response: {http_error}")
+            raise DalException
+        except aiohttp.ClientConnectionError as connection_error:
+            logger.warning(f"Attempt {attempt} failed after {(time.perf_counter() - started) * 1000:.0f} ms: "
+                           f"{connection_error}")
+            if attempt > MAX_RETRIES:
+                logger.error(f"Connection failed: {connection_error}")
+                treasury_breaker.record_failure()
+                raise DalException
+        except aiohttp.ClientError as e:
+            logger.error(f"Request failed: {e}")
+            treasury_breaker.record_failure()
+            raise DalException
+        except ValueError as json_error:
+            logger.error(f"Invalid format received: {json_error}")
+            raise DalException
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+def _decode_response(response):
+    """
+    Checks and decodes a response from the threaded DAL (used when aiohttp isn't installed)
+    :param response: response from fetch_treasury_data()
+    :return: the decoded JSON body of the response
+    """
+    try:
+        response.raise_for_status()
+        return response.json()
+    except requests.HTTPError as http_error:
+        logger.error(f"Failed HTTP Response: {http_error}")
+        raise DalException
+    except ValueError as json_error:
+        logger.error(f"Invalid format received: {json_error}")
+        raise DalException
@@ -0,0 +1,120 @@
+import threading
+import time
+from logging_config import get_logger
+
+"""
+This module contains a class to model a circuit breaker, which stops the DAL from calling the Treasury API for a while
+after it has failed several times in a row, so callers fail fast instead of each waiting out the timeouts and retries.
+
+Methods:
+--------
+    allow_request(self) -> bool:
+        Whether a request may go out right now (and, once the reset timeout has passed, lets one probe through)
+    record_success(self):
+        Closes the circuit after a request succeeds
+    record_failure(self):
+        Counts a failed request, opening the circuit once failure_threshold failures happen in a row
+    seconds_until_retry(self) -> float:
+        How long until an open circuit will let a probe request through
+
+Constants:
+----------
+    CLOSED: requests flow normally
+    OPEN: requests are refused until the reset timeout passes
+    HALF_OPEN: a single probe request is in flight to test whether the API has recovered
+    FAILURE_THRESHOLD: consecutive failures before the circuit opens
+    RESET_TIMEOUT: seconds the circuit stays open before a probe is allowed, and the longest a probe may take before it
+        counts as failed
+
+"""
+
+__all__ = ['CLOSED', 'OPEN', 'HALF_OPEN', 'FAILURE_THRESHOLD', 'RESET_TIMEOUT', 'CircuitBreaker']
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30
+logger = get_logger(__name__)
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failure_count = 0
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f"{self._name} circuit: {self._state}"
+
+    def __repr__(self):
+        return f"{self._name} circuit: {self._state}"
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Whether a request may go out right now. Once an open circuit's reset timeout has passed it goes half-open and
+        lets exactly one probe request through, everything else is refused until that probe is recorded. A probe that
+        is never recorded (its task was cancelled, say) counts as failed once it has taken longer than the reset
+        timeout, so the circuit can't stay half-open for good.
+        :return: True if the request may be made, False if it should fail fast
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self._state == HALF_OPEN and now - self._probe_started_at >= self._reset_timeout:
+                logger.warning(f"{self._name} circuit probe never came back, counting it as failed")
+                # open since the probe went out, so its reset timeout has already passed and the next probe goes now
+                self._state = OPEN
+                self._opened_at = self._probe_started_at
+            if self._state == OPEN and now - self._opened_at >= self._reset_timeout:
+                logger.info(f"{self._name} circuit half-open, letting a probe request through")
+                self._state = HALF_OPEN
+                self._probe_started_at = now
+                return True
+            return False
+
+    def record_success(self):
+        """
+        Closes the circuit after a request succeeds
+        :return: n/a
+        """
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"{self._name} circuit closed, the API has recovered")
+            self._state = CLOSED
+            self._failure_count = 0
+
+    def record_failure(self):
+        """
+        Counts a failed request, opening the circuit once failure_threshold failures happen in a row (or straight away
+        if the failure was the half-open probe)
+        :return: n/a
+        """
+        with self._lock:
+            self._failure_count += 1
+            if self._state == HALF_OPEN or self._failure_count >= self._failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(f"{self._name} circuit open after {self._failure_count} failures, "
+                                   f"failing fast for {self._reset_timeout} seconds")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def seconds_until_retry(self) -> float:
+        """
+        How long until an open circuit will let a probe request through
+        :return: seconds to wait, 0 if a request may be made now
+        """
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._reset_timeout - (time.monotonic() - self._opened_at))
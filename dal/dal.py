@@ -1,14 +1,43 @@
-from exceptions import DalException
+import itertools
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from exceptions import DalException, CircuitOpenException
 from logging_config import get_logger
+from requests.adapters import HTTPAdapter
+from .circuit_breaker import CircuitBreaker
 import requests
 
 """
-This module contains a single method to fetch conversion data from the Treasury API
+This module contains methods to fetch conversion data from the Treasury API
 
 Methods:
 --------
-    fetch_treasury_data():
+    fetch_treasury_data(record_date=None, page_number=DESIRED_PAGE_NUMBER, page_size=DESIRED_PAGE_SIZE,
+                        conditional=False, stream=False, earliest_record_date=None):
         Makes HTTP request to the Treasury api and returns the response, also checks for several errors.
+    fetch_treasury_pages(record_date=None, page_size=DESIRED_PAGE_SIZE, max_workers=MAX_PAGE_WORKERS,
+                         conditional=False, stream=False, earliest_record_date=None):
+        Fetches every page of a Treasury query, the first page serially and the rest concurrently.
+    get_with_retries(url, params, headers, stream=False):
+        Makes a GET request with the shared session, retrying connection errors, timeouts and 5xx responses.
+    backoff_delay(attempt):
+        How long to wait before retrying after a given failed attempt (exponential backoff with full jitter).
+    build_query_params(record_date=None, page_number=DESIRED_PAGE_NUMBER, page_size=DESIRED_PAGE_SIZE,
+                       earliest_record_date=None):
+        Builds the query string parameters for a page of the rates of exchange endpoint.
+    forget_validators():
+        Forgets every ETag/Last-Modified validator remembered from previous fetches.
+    read_total_pages(response):
+        Reads the total page count out of a Treasury API response's meta block.
+    get_session():
+        Returns the DAL's shared, pooled requests.Session, creating it on first use.
+    configure_session(pool_size=POOL_SIZE, keep_alive=True):
+        (Re)builds the shared session with the given connection pool size and keep-alive setting.
+    close_session():
+        Closes the shared session and its pooled connections.
         
 Constants:
 ----------
@@ -16,6 +45,24 @@ Constants:
     ENDPOINT: the endpoint for rates of exchange
     DESIRED_PAGE_NUMBER: the page number I want from the treasury API (1)
     DESIRED_PAGE_SIZE: the amount of results I want on my one page 
+    DESIRED_FIELDS: the only columns we ask the treasury API to send back
+    SORT_ORDER: newest first, then by country and currency so every row has a fixed place across pages
+    MAX_PAGE_WORKERS: the most pages fetch_treasury_pages() will have in flight at once
+    POOL_SIZE: how many keep-alive connections the shared session holds on to
+    ACCEPT_ENCODING: the compression schemes we tell the treasury API we can take
+    NOT_MODIFIED: the HTTP status code the treasury API answers a conditional request with when nothing changed
+    CONNECT_TIMEOUT: seconds to wait for a connection to the treasury API
+    READ_TIMEOUT: seconds to wait between bytes of the treasury API's response
+    MAX_RETRIES: how many times a failed request is retried before giving up
+    BACKOFF_BASE: seconds of backoff before the first retry, doubled for each retry after that
+    BACKOFF_CAP: the most seconds of backoff before any one retry
+    SERVER_ERROR: the lowest HTTP status code worth retrying
+    TOTAL_PAGES: matches the page count in the meta block of a response body
+
+Attributes:
+-----------
+    treasury_breaker: the CircuitBreaker every treasury API request goes through, it opens after repeated failures and
+        makes fetch_treasury_data() raise CircuitOpenException straight away until a probe request succeeds
     
 """
 
@@ -23,31 +70,327 @@ BASE_URL = 'https://api.fiscaldata.treasury.gov/services/api/fiscal_service'
 ENDPOINT = '/v1/accounting/od/rates_of_exchange'
 DESIRED_PAGE_NUMBER = 1
 DESIRED_PAGE_SIZE = 200
+DESIRED_FIELDS = ('country', 'currency', 'exchange_rate', 'record_date')
+SORT_ORDER = ('-record_date', 'country', 'currency')
+MAX_PAGE_WORKERS = 4
+POOL_SIZE = 10
+ACCEPT_ENCODING = 'gzip, deflate'
+NOT_MODIFIED = 304
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 15
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8
+SERVER_ERROR = 500
+TOTAL_PAGES = re.compile(rb'"total-pages"\s*:\s*(\d+)')
 logger = get_logger(__name__)
+_session = None
+_session_lock = threading.Lock()
+_validators = {}  # (record_date, earliest_record_date, page_number, page_size) -> (ETag, Last-Modified)
+_validators_lock = threading.Lock()
+treasury_breaker = CircuitBreaker('Treasury API')
 
 
-def fetch_treasury_data():
+def fetch_treasury_data(record_date=None, page_number=DESIRED_PAGE_NUMBER, page_size=DESIRED_PAGE_SIZE,
+                        conditional=False, stream=False, earliest_record_date=None):
     """
     Makes HTTP request to the Treasury api and returns the response, also checks for several errors.
+    :param record_date: ISO formatted date string, if given the API only sends back rates published on that date
+                        (or on or before it, see earliest_record_date)
+    :param page_number: which page of results to fetch (1 based)
+    :param page_size: how many rows to put on a page
+    :param conditional: send the validators from the last fetch of this same page, so an unchanged page comes back
+                        as an empty 304 Not Modified instead of the full JSON body
+    :param stream: return as soon as the headers arrive and leave the body to be read incrementally (iter_content)
+    :param earliest_record_date: ISO formatted date string, if given along with record_date the API sends back every
+                                 rate published from this date up to record_date instead
     :return: response from the treasury api
     """
-    logger.info('Fetching currency data from the treasury API')
+    record_dates = f"{earliest_record_date} to {record_date}" if earliest_record_date else record_date or 'any'
+    logger.info(f"Fetching page {page_number} of currency data from the treasury API (record date: {record_dates})")
     url = f"{BASE_URL}{ENDPOINT}"
-    params = {'sort': '-record_date',
-              'format': 'json',
-              'page[number]': DESIRED_PAGE_NUMBER,
-              'page[size]': DESIRED_PAGE_SIZE}
+    params = build_query_params(record_date, page_number, page_size, earliest_record_date)
+    validator_key = (record_date, earliest_record_date, page_number, page_size)
+    headers = _conditional_headers(validator_key) if conditional else {}
+    if not treasury_breaker.allow_request():
+        logger.warning(f"Not calling the treasury API, circuit open for another "
+                       f"{treasury_breaker.seconds_until_retry():.0f} seconds")
+        raise CircuitOpenException
     try:
-        response = requests.get(url, params=params)
+        response = get_with_retries(url, params, headers, stream)
+        if response.status_code >= SERVER_ERROR:
+            treasury_breaker.record_failure()
+        else:
+            treasury_breaker.record_success()
+        if response.status_code == NOT_MODIFIED:
+            logger.info('Currency data unchanged since the last fetch (304 Not Modified)')
+            return response
+        _remember_validators(validator_key, response)
         logger.info('Successfully fetched currency data in DAL')
         return response
     except requests.Timeout as time_out:
         logger.error(f"Request timed out: {time_out}")
+        treasury_breaker.record_failure()
         raise DalException
     except requests.ConnectionError as connection_error:
         logger.error(f"Connection failed: {connection_error}")
+        treasury_breaker.record_failure()
         raise DalException
     except requests.RequestException as e:
         logger.error(f"Request failed: {e}")
+        treasury_breaker.record_failure()
         raise DalException
 
+
+def fetch_treasury_pages(record_date=None, page_size=DESIRED_PAGE_SIZE, max_workers=MAX_PAGE_WORKERS,
+                         conditional=False, stream=False, earliest_record_date=None):
+    """
+    Fetches every page of a Treasury query. The first page is fetched on its own to learn meta.total-pages, the rest
+    are fetched concurrently and yielded in whatever order they arrive. At most max_workers pages are out at a time,
+    counting the ones fetched but not yet handed to the caller, and each page is closed once the caller asks for the
+    next one, so there are never more than max_workers responses (and pooled connections) held open.
+    :param record_date: ISO formatted date string, if given only rates published on that date (None for all history)
+    :param page_size: how many rows to put on a page
+    :param max_workers: the most pages to have in flight (or waiting on the caller) at once
+    :param conditional: make the first page a conditional request, if it comes back 304 Not Modified it is the only
+                        response yielded (the query's results haven't changed, so neither have the later pages)
+    :param stream: leave the body of every page after the first to be read incrementally, the caller has to be done
+                   with it before asking for the next page (the first page is never streamed, its body has to be read
+                   in full to learn the page count before the caller gets it)
+    :param earliest_record_date: ISO formatted date string, if given along with record_date every rate published from
+                                 this date up to record_date
+    :return: a generator of responses from the treasury api, one per page
+    """
+    first_page = fetch_treasury_data(record_date, DESIRED_PAGE_NUMBER, page_size, conditional, False,
+                                     earliest_record_date)
+    if first_page.status_code == NOT_MODIFIED:
+        yield first_page
+        return
+    # read before yielding, once the caller has the page it may consume the body (iter_content) before we resume
+    total_pages = read_total_pages(first_page)
+    yield first_page
+    if total_pages <= DESIRED_PAGE_NUMBER:
+        return
+    logger.info(f"Fetching {total_pages - DESIRED_PAGE_NUMBER} more pages with up to {max_workers} workers")
+    page_numbers = iter(range(DESIRED_PAGE_NUMBER + 1, total_pages + 1))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def fetch_page(page_number):
+        return executor.submit(fetch_treasury_data, record_date, page_number, page_size, False, stream,
+                               earliest_record_date)
+
+    unread = {fetch_page(page_number) for page_number in itertools.islice(page_numbers, max_workers)}
+    try:
+        while unread:
+            done, _ = wait(unread, return_when=FIRST_COMPLETED)
+            for future in done:
+                unread.remove(future)
+                response = future.result()
+                yield response
+                # the caller is done with this page's body, give its connection back before fetching another
+                response.close()
+                next_page_number = next(page_numbers, None)
+                if next_page_number is not None:
+                    unread.add(fetch_page(next_page_number))
+    finally:
+        # if the caller stops early (or a page fails) don't bother fetching what's still queued, and close what was
+        # already fetched (or is still on its way) since nobody is going to read it
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future in unread:
+            future.add_done_callback(_close_unread_page)
+
+
+def _close_unread_page(future):
+    """
+    Closes the response of a page nobody is going to read (a done callback for fetch_treasury_pages()'s futures), so
+    its connection goes back to the pool
+    :param future: the page's concurrent.futures.Future
+    :return: n/a
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def get_with_retries(url, params, headers, stream=False):
+    """
+    Makes a GET request with the shared session. Connection errors, timeouts and 5xx responses are retried up to
+    MAX_RETRIES times with jittered exponential backoff, and every attempt's latency is logged.
+    :param url: the url to request
+    :param params: query string parameters
+    :param headers: extra request headers
+    :param stream: return as soon as the headers arrive, leaving the body unread
+    :return: the response of the last attempt (which may still be a 5xx once the retries run out)
+    """
+    for attempt in range(1, MAX_RETRIES + 2):
+        started = time.perf_counter()
+        try:
+            response = get_session().get(url, params=params, headers=headers, stream=stream,
+                                         timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        except (requests.Timeout, requests.ConnectionError) as error:
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.warning(f"Attempt {attempt} failed after {elapsed:.0f} ms: {error}")
+            if attempt > MAX_RETRIES:
+                raise
+        else:
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info(f"Attempt {attempt} returned {response.status_code} in {elapsed:.0f} ms")
+            if response.status_code < SERVER_ERROR or attempt > MAX_RETRIES:
+                return response
+            # hand the connection back to the pool, we won't be reading this body
+            response.close()
+        delay = backoff_delay(attempt)
+        logger.info(f"Retrying in {delay:.2f} seconds")
+        time.sleep(delay)
+
+
+def backoff_delay(attempt):
+    """
+    How long to wait before retrying after a given failed attempt. (exponential backoff with full jitter, so a
+    crowd of clients that failed together doesn't retry together)
+    :param attempt: the attempt that just failed (1 based)
+    :return: the delay in seconds
+    """
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def build_query_params(record_date=None, page_number=DESIRED_PAGE_NUMBER, page_size=DESIRED_PAGE_SIZE,
+                       earliest_record_date=None):
+    """
+    Builds the query string parameters for a page of the rates of exchange endpoint.
+    :param record_date: ISO formatted date string, if given the API only sends back rates published on that date
+    :param page_number: which page of results to fetch (1 based)
+    :param page_size: how many rows to put on a page
+    :param earliest_record_date: ISO formatted date string, if given along with record_date the API sends back the
+                                 rates published from this date up to record_date (both ends included)
+    :return: a dict of query parameters
+    """
+    # pages are fetched concurrently by number, so rows sharing a record date need a fixed order or a row can shift
+    # between pages from one request to the next and be skipped (or come back twice)
+    params = {'fields': ','.join(DESIRED_FIELDS),
+              'sort': ','.join(SORT_ORDER),
+              'format': 'json',
+              'page[number]': page_number,
+              'page[size]': page_size}
+    # let the API do the filtering instead of downloading other quarters just to throw them away
+    if record_date is not None and earliest_record_date is not None:
+        params['filter'] = f"record_date:gte:{earliest_record_date},record_date:lte:{record_date}"
+    elif record_date is not None:
+        params['filter'] = f"record_date:eq:{record_date}"
+    return params
+
+
+def forget_validators():
+    """
+    Forgets every ETag/Last-Modified validator remembered from previous fetches.
+    :return: n/a
+    """
+    with _validators_lock:
+        _validators.clear()
+
+
+def _conditional_headers(validator_key):
+    """
+    Builds the If-None-Match/If-Modified-Since headers for a page we've fetched before.
+    :param validator_key: (record_date, earliest_record_date, page_number, page_size) of the page
+    :return: a dict of headers, empty if we have no validators for that page
+    """
+    with _validators_lock:
+        etag, last_modified = _validators.get(validator_key, (None, None))
+    headers = {}
+    if etag is not None:
+        headers['If-None-Match'] = etag
+    if last_modified is not None:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def _remember_validators(validator_key, response):
+    """
+    Remembers the ETag/Last-Modified validators of a successful response for the next conditional fetch.
+    :param validator_key: (record_date, earliest_record_date, page_number, page_size) of the page
+    :param response: response from the treasury api
+    :return: n/a
+    """
+    if not response.ok:
+        return
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    with _validators_lock:
+        if etag is None and last_modified is None:
+            _validators.pop(validator_key, None)
+        else:
+            _validators[validator_key] = (etag, last_modified)
+
+
+def read_total_pages(response):
+    """
+    Reads the total page count out of a Treasury API response's meta block.
+    :param response: response from the treasury api
+    :return: meta.total-pages, or 1 if the response doesn't have one (an error response, for example)
+    """
+    # the caller decodes the body itself (with a faster decoder than requests'), so rather than decoding it a second
+    # time just to get at one number, pick the count out of the raw bytes
+    match = TOTAL_PAGES.search(response.content)
+    if match is None:
+        # the caller parses the page itself and will report whatever is actually wrong with it
+        logger.warning('Could not read the page count, assuming one page')
+        return DESIRED_PAGE_NUMBER
+    return int(match.group(1))
+
+
+def get_session():
+    """
+    Returns the DAL's shared, pooled requests.Session, creating it on first use. Sharing one session between the GUI's
+    executor threads (and any batch jobs) means repeated fetches reuse an open connection instead of doing a new TCP
+    and TLS handshake every time.
+    :return: a requests.Session
+    """
+    with _session_lock:
+        if _session is None:
+            _build_session(POOL_SIZE, True)
+        return _session
+
+
+def configure_session(pool_size=POOL_SIZE, keep_alive=True):
+    """
+    (Re)builds the shared session with the given connection pool size and keep-alive setting.
+    :param pool_size: how many connections to keep open (should be at least the number of threads fetching at once)
+    :param keep_alive: whether to keep connections open between requests
+    :return: the new requests.Session
+    """
+    with _session_lock:
+        return _build_session(pool_size, keep_alive)
+
+
+def close_session():
+    """
+    Closes the shared session and its pooled connections, the next fetch will open a new one.
+    :return: n/a
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+            logger.info('Closed the shared HTTP session')
+
+
+def _build_session(pool_size, keep_alive):
+    """
+    Builds the shared session, closing any previous one (caller must hold _session_lock)
+    :param pool_size: how many connections to keep open
+    :param keep_alive: whether to keep connections open between requests
+    :return: the new requests.Session
+    """
+    global _session
+    if _session is not None:
+        _session.close()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': ACCEPT_ENCODING,
+                            'Connection': 'keep-alive' if keep_alive else 'close'})
+    _session = session
+    logger.info(f"Built a shared HTTP session (pool size: {pool_size}, keep-alive: {keep_alive})")
+    return session
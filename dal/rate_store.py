@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import threading
+from exceptions import DalException
+from logging_config import get_logger
+
+"""
+This module contains methods to persist parsed exchange rate rows in a local SQLite database, so a cold start can read
+the current quarter from disk instead of waiting on the Treasury API.
+
+Methods:
+--------
+    load_rates(record_date, earliest_record_date=None):
+        Loads every stored rate row for a given record date (or range of record dates).
+    save_rates(rows):
+        Inserts (or replaces) rate rows in the store.
+    get_connection():
+        Opens a connection to the store, creating the database and its schema on first use.
+
+Constants:
+----------
+    DB_PATH: where the SQLite database lives (relative to the working directory, same as the log file)
+
+"""
+
+__all__ = ['DB_PATH', 'get_connection', 'load_rates', 'save_rates']
+
+DB_PATH = 'data/rates.db'
+logger = get_logger(__name__)
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def get_connection():
+    """
+    Opens a connection to the store, creating the database and its schema on first use.
+    (sqlite connections can't be shared between threads, so every call gets its own)
+    :return: a sqlite3.Connection with rows returned as sqlite3.Row
+    """
+    global _schema_ready
+    directory = os.path.dirname(DB_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(DB_PATH)
+    connection.row_factory = sqlite3.Row
+    with _schema_lock:
+        if not _schema_ready:
+            # the primary key doubles as the record_date index the loads go through
+            connection.execute("""CREATE TABLE IF NOT EXISTS rates (
+                                      record_date TEXT NOT NULL,
+                                      country TEXT NOT NULL,
+                                      currency TEXT NOT NULL,
+                                      exchange_rate TEXT NOT NULL,
+                                      PRIMARY KEY (record_date, country, currency))""")
+            connection.commit()
+            _schema_ready = True
+    return connection
+
+
+def load_rates(record_date, earliest_record_date=None):
+    """
+    Loads every stored rate row for a given record date.
+    :param record_date: ISO formatted date string, e.g. '2023-09-30'
+    :param earliest_record_date: ISO formatted date string, if given every row from this date up to record_date is
+                                 loaded instead
+    :return: a list of dicts shaped like the Treasury API's data rows (empty if nothing is stored for that date)
+    """
+    earliest_record_date = record_date if earliest_record_date is None else earliest_record_date
+    try:
+        connection = get_connection()
+        try:
+            cursor = connection.execute('SELECT record_date, country, currency, exchange_rate FROM rates '
+                                        'WHERE record_date BETWEEN ? AND ?', (earliest_record_date, record_date))
+            rows = [dict(row) for row in cursor]
+        finally:
+            connection.close()
+        logger.info(f"Loaded {len(rows)} stored rates for {earliest_record_date} to {record_date}")
+        return rows
+    except sqlite3.Error as db_error:
+        logger.error(f"Failed to load stored rates: {db_error}")
+        raise DalException
+
+
+def save_rates(rows):
+    """
+    Inserts (or replaces) rate rows in the store.
+    :param rows: an iterable of dicts with record_date, country, currency and exchange_rate keys
+    :return: n/a
+    """
+    try:
+        connection = get_connection()
+        try:
+            # the with block commits (or rolls back) the whole batch as one transaction
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO rates (record_date, country, currency, exchange_rate) '
+                                       'VALUES (:record_date, :country, :currency, :exchange_rate)', rows)
+        finally:
+            connection.close()
+        logger.info('Saved rates to the local store')
+    except sqlite3.Error as db_error:
+        logger.error(f"Failed to save rates: {db_error}")
+        raise DalException
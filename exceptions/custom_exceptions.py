@@ -9,6 +9,8 @@ Custom Exception Types:
         an exception to be used if a product is not found within the database
     DalException:
         an exception for an error in the data access layer
+    CircuitOpenException:
+        a DalException raised without even trying the request, because the circuit breaker is open
     BusinessLogicException:
         an exception for an error in business logic (to be honest I'm having trouble remembering how this is different
         from a DalException)
@@ -28,5 +30,9 @@ class DalException(AppBaseException):
     pass
 
 
+class CircuitOpenException(DalException):
+    pass
+
+
 class BusinessLogicException(AppBaseException):
     pass
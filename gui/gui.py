@@ -22,8 +22,10 @@ Methods:
         Passes currency data dict to the main thread to be displayed on in the country combobox. 
     update_conversion_form_first_load(self, currency_dict):
         Handles updating the gui (country dropdown) after successful treasury api call. 
+    filter_dropdown(self, event):
+        Narrows the country dropdown down to the countries matching what has been typed into it
     request_currency_data_for_convert(self):
-        Starts a new thread to retrieve currency data from Treasury api for conversion. 
+        Starts a new thread to retrieve the cached currency data for conversion. 
     on_currency_data_received_for_convert(self, future):
         Passes currency dict data to the main thread after non-daemon thread is done running.
     update_conversion_form_for_convert(self, currency_dict):
@@ -34,17 +36,22 @@ Methods:
         Updates results_text with a given message
     validate_usd(self):
         Validates the user input within the USD entry
-    validate_combobox(self):
-        Validates that a country is selected from the combobox
+    validate_combobox(self, currency_dict):
+        Validates that a country from currency_dict is selected in the combobox
     is_float(self, value):
         Determines if a given value is a float
 """
 
 
+# keys that move around the dropdown rather than change what's typed in it
+NAVIGATION_KEYS = {'Up', 'Down', 'Left', 'Right', 'Return', 'KP_Enter', 'Escape', 'Tab', 'Home', 'End'}
+
+
 class ConversionForm(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title('Currency Converter')
+        self.search_index = None
         self.create_widgets()
         self.executor = concurrent.futures.ThreadPoolExecutor()
         self.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -60,6 +67,7 @@ class ConversionForm(tk.Tk):
         self.select_currency_label.grid(row=0, column=0, padx=5, pady=5, sticky='w')
         self.currency_dropdown = ttk.Combobox(self, state='disabled')
         self.currency_dropdown.grid(row=0, column=1, padx=5, pady=5)
+        self.currency_dropdown.bind('<KeyRelease>', self.filter_dropdown)
 
         # USD amount label/entry
         self.enter_usd_label = ttk.Label(self, text="Enter amount in USD: ")
@@ -104,10 +112,10 @@ class ConversionForm(tk.Tk):
 
     def request_currency_data_for_combobox(self):
         """
-        Retrieves currency data from Treasury API
+        Retrieves currency data from Treasury API (this populates the business layer's rate cache)
         :return: n/a
         """
-        future = self.executor.submit(business.get_currency_data)
+        future = self.executor.submit(business.get_cached_currency_data)
         future.add_done_callback(self.on_currency_data_received_first_load)
 
     def on_currency_data_received_first_load(self, future):
@@ -132,16 +140,34 @@ class ConversionForm(tk.Tk):
         key_list = list(currency_dict.keys())
         # self.check_for_duplicates(key_list)
         self.currency_dropdown.config(values=key_list)
-        self.update_text("Currencies loaded, ready to convert!")
-        self.currency_dropdown.config(state='readonly')
+        # the index is built once per quarter's rates, after that each keystroke is a lookup or two
+        self.search_index = business.get_search_index(currency_dict)
+        if business.is_serving_stale():
+            self.update_text("Currencies loaded from the last good fetch (the Treasury API is unavailable right now).")
+        else:
+            self.update_text("Currencies loaded, ready to convert!")
+        # editable, so the user can type to filter the list
+        self.currency_dropdown.config(state='normal')
         self.convert_button.config(state='normal')
 
+    def filter_dropdown(self, event):
+        """
+        Narrows the country dropdown down to the countries matching what has been typed into it (by country, currency
+        name or ISO code, see business.search_index)
+        :param event: the KeyRelease event
+        :return: n/a
+        """
+        if self.search_index is None or event.keysym in NAVIGATION_KEYS:
+            return
+        self.currency_dropdown.config(values=self.search_index.search(self.currency_dropdown.get()))
+
     def request_currency_data_for_convert(self):
         """
-        Starts a new thread to retrieve currency data from Treasury api for conversion.
+        Starts a new thread to retrieve the cached currency data for conversion. (only hits the Treasury api if the
+        first load didn't manage to populate the cache)
         :return: n/a
         """
-        future = self.executor.submit(business.get_currency_data)
+        future = self.executor.submit(business.get_cached_currency_data)
         future.add_done_callback(self.on_currency_data_received_for_convert)
 
     def on_currency_data_received_for_convert(self, future):
@@ -163,7 +189,7 @@ class ConversionForm(tk.Tk):
         :return: n/a
         """
         # grab the usd amount
-        if self.validate_combobox() and self.validate_usd():
+        if self.validate_combobox(currency_dict) and self.validate_usd():
             usd_amount = self.usd_entry.get()
             # grab the country name from the dropdown
             country_to_convert = self.currency_dropdown.get()
@@ -176,6 +202,8 @@ class ConversionForm(tk.Tk):
                 conversion_string = currency.convert(float(usd_amount))
                 # put it in the result text
                 self.result_text.insert(tk.END, f"{conversion_string}\n")
+            if business.is_serving_stale():
+                self.result_text.insert(tk.END, "(Treasury API unavailable, these are the last rates we received)\n")
             # lock the result text again
             self.result_text.config(state='disabled')
             # unlock the convert button
@@ -219,15 +247,20 @@ class ConversionForm(tk.Tk):
         else:
             return True
 
-    def validate_combobox(self):
+    def validate_combobox(self, currency_dict):
         """
-        Validates that a country is selected from the combobox
-        :return: False if combobox has no selection, True if it has a selection.
+        Validates that a country is selected from the combobox (now that it can be typed into, that the text is one of
+        the countries in currency_dict)
+        :param currency_dict: a dict of currency objects
+        :return: False if combobox has no valid selection, True if it has one.
         """
         selected_item = self.currency_dropdown.get()
         if selected_item == "":
             messagebox.showinfo('Error', "You have to select a currency!")
             return False
+        if selected_item not in currency_dict:
+            messagebox.showinfo('Error', "Pick one of the countries in the list (typing filters it).")
+            return False
         else:
             return True
 
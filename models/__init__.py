@@ -1 +1,6 @@
 from .currency import *
+from .rate_table import *
+from .batch_conversion import *
+from .formatting import *
+from .decimal_math import *
+from .rate_history import *
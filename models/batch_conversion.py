@@ -0,0 +1,37 @@
+import operator
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional, without it batches are converted into an array('d') one element at a time
+    np = None
+
+"""
+The batch_conversion module contains methods to convert many USD amounts at once. With NumPy installed the multiply is
+vectorized (one call for the whole batch instead of a Python level multiply and f-string per amount), and formatting
+is a separate, optional step (see the formatting module) so callers that only want the numbers never pay for it.
+
+Methods:
+--------
+    convert_batch(usd_amounts, rates):
+        multiplies every USD amount by its rate (or every amount by the same rate)
+
+"""
+
+__all__ = ['convert_batch']
+
+
+def convert_batch(usd_amounts, rates):
+    """
+    multiplies every USD amount by its rate (or every amount by the same rate)
+    :param usd_amounts: a sequence (or NumPy array) of USD amounts
+    :param rates: a single rate, or a sequence (or NumPy array) of rates the same length as usd_amounts
+    :return: a NumPy float64 array of converted amounts, or an array('d') when NumPy isn't installed
+    """
+    if np is not None:
+        return np.multiply(np.asarray(usd_amounts, dtype=np.float64), np.asarray(rates, dtype=np.float64))
+    if isinstance(rates, (int, float)):
+        return array('d', (usd_amount * rates for usd_amount in usd_amounts))
+    if len(rates) != len(usd_amounts):
+        raise ValueError(f"Got {len(usd_amounts)} amounts but {len(rates)} rates")
+    return array('d', map(operator.mul, usd_amounts, rates))
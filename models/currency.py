@@ -1,19 +1,60 @@
+from decimal import Decimal
+from .batch_conversion import convert_batch
+from .decimal_math import FLOAT_MODE, DECIMAL_MODE, quantize_rate, multiply_amount, multiply_amounts
+from .formatting import format_conversion
+
 """
 The currency module contains a class to model a currency object with a country name, currency name, and exchange rate.
 
+Currency objects are immutable and slotted (no per-instance __dict__), and the exchange rate is parsed into a float
+once when the object is built rather than on every conversion, so holding many quarters' worth of them stays cheap.
+The rate is also kept as a pre-quantized Decimal for exact conversions (mode=DECIMAL_MODE, see decimal_math): handed
+in ready made by a RateTable, quantized from the API's string when built from one, or worked out from the float on
+first use, so lookups that only ever convert with floats never pay for it.
+
 Methods:
 --------
-    convert(self, usd_amount: float) -> str:
+    convert(self, usd_amount: float, mode: str = FLOAT_MODE) -> str:
         converts usd amount to a given currency (self._currency_name) by multiplying usd amount by self._conversion_rate
+    convert_amount(self, usd_amount: float, mode: str = FLOAT_MODE):
+        converts usd amount to a given currency, as a number (no string formatting)
+    convert_many(self, usd_amounts, mode: str = FLOAT_MODE):
+        converts a whole batch of usd amounts to this currency at once (see batch_conversion.convert_batch)
 
 """
 
 
 class Currency:
-    def __init__(self, country_name, currency_name, conversion_rate):
-        self._country_name = country_name
-        self._currency_name = currency_name
-        self._conversion_rate = conversion_rate
+    __slots__ = ('_country_name', '_currency_name', '_conversion_rate', '_decimal_rate')
+
+    def __init__(self, country_name, currency_name, conversion_rate, decimal_rate=None):
+        # the API (and the local rate store) hand us the rate as a string, parse it once here
+        object.__setattr__(self, '_country_name', country_name)
+        object.__setattr__(self, '_currency_name', currency_name)
+        object.__setattr__(self, '_conversion_rate', float(conversion_rate))
+        if decimal_rate is None and not isinstance(conversion_rate, float):
+            decimal_rate = quantize_rate(conversion_rate)
+        # None for a float rate until the first Decimal conversion asks for it (see decimal_rate)
+        object.__setattr__(self, '_decimal_rate', decimal_rate)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Currency objects are immutable, can't set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Currency objects are immutable, can't delete {name}")
+
+    def __reduce__(self):
+        # __setattr__ is blocked, so pickle (and copy) have to go through __init__
+        return Currency, (self._country_name, self._currency_name, self._conversion_rate, self._decimal_rate)
+
+    def __eq__(self, other):
+        if not isinstance(other, Currency):
+            return NotImplemented
+        return ((self._country_name, self._currency_name, self._conversion_rate) ==
+                (other._country_name, other._currency_name, other._conversion_rate))
+
+    def __hash__(self):
+        return hash((self._country_name, self._currency_name, self._conversion_rate))
 
     def __str__(self):
         return f"{self._country_name}, {self._currency_name}: {self._conversion_rate}"
@@ -21,11 +62,57 @@ class Currency:
     def __repr__(self):
         return f"{self._country_name}, {self._currency_name}: {self._conversion_rate}"
 
-    def convert(self, usd_amount: float) -> str:
+    @property
+    def country_name(self) -> str:
+        return self._country_name
+
+    @property
+    def currency_name(self) -> str:
+        return self._currency_name
+
+    @property
+    def conversion_rate(self) -> float:
+        return self._conversion_rate
+
+    @property
+    def decimal_rate(self) -> Decimal:
+        if self._decimal_rate is None:
+            object.__setattr__(self, '_decimal_rate', quantize_rate(self._conversion_rate))
+        return self._decimal_rate
+
+    def convert(self, usd_amount: float, mode: str = FLOAT_MODE) -> str:
         """
         converts usd amount to a given currency (self._currency_name) by multiplying usd amount by self._conversion_rate
         :param usd_amount: USD amount to convert (from gui/user)
+        :param mode: FLOAT_MODE or DECIMAL_MODE (see convert_amount)
         :return: A string e.g. "$100.00 USD = 94.00 Euro"
         """
-        converted_currency = usd_amount * float(self._conversion_rate)
-        return f"${usd_amount:,.2f} USD = {converted_currency:,.2f} {self._currency_name}"
+        return format_conversion(usd_amount, self.convert_amount(usd_amount, mode), self._currency_name)
+
+    def convert_amount(self, usd_amount: float, mode: str = FLOAT_MODE):
+        """
+        converts usd amount to a given currency, as a number (for callers that don't need the display string)
+        :param usd_amount: USD amount to convert (a Decimal or str keeps DECIMAL_MODE exact end to end)
+        :param mode: FLOAT_MODE for a plain float multiply, DECIMAL_MODE for exact Decimal arithmetic rounded to cents
+        :return: the amount in this currency (float in FLOAT_MODE, Decimal in DECIMAL_MODE)
+        """
+        if mode == FLOAT_MODE:
+            return usd_amount * self._conversion_rate
+        if mode == DECIMAL_MODE:
+            return multiply_amount(usd_amount, self.decimal_rate)
+        raise ValueError(f"Unknown arithmetic mode: {mode}")
+
+    def convert_many(self, usd_amounts, mode: str = FLOAT_MODE):
+        """
+        converts a whole batch of usd amounts to this currency at once, leaving formatting to the caller (see
+        batch_conversion.format_conversions)
+        :param usd_amounts: a sequence (or NumPy array) of USD amounts (Decimals or strs keep DECIMAL_MODE exact)
+        :param mode: FLOAT_MODE for a vectorized float multiply, DECIMAL_MODE for exact Decimal arithmetic rounded to
+                     cents (see decimal_math.multiply_amounts)
+        :return: a NumPy array of converted amounts (an array('d') without NumPy), a list of Decimals in DECIMAL_MODE
+        """
+        if mode == FLOAT_MODE:
+            return convert_batch(usd_amounts, self._conversion_rate)
+        if mode == DECIMAL_MODE:
+            return multiply_amounts(usd_amounts, self.decimal_rate)
+        raise ValueError(f"Unknown arithmetic mode: {mode}")
@@ -0,0 +1,91 @@
+from decimal import Decimal, Context, ROUND_HALF_UP, localcontext
+
+"""
+The decimal_math module contains the shared settings and helpers for exact (Decimal) money arithmetic. Float
+multiplication introduces binary rounding error that finance won't sign off on, while naive Decimal code (building a
+Decimal from a string and looking up the thread's context on every call) is several times slower than it has to be.
+So rates are converted and quantized once, when they're parsed (a RateTable keeps a column of them), and every
+conversion reuses one Context. Batches go through multiply_amounts(), which switches to that Context once per batch
+instead of passing it to every operation.
+
+Methods:
+--------
+    to_decimal(value) -> Decimal:
+        converts a rate or amount to a Decimal without picking up float representation error
+    quantize_rate(value) -> Decimal:
+        converts a rate to a Decimal rounded to RATE_QUANTUM
+    multiply_amount(amount, rate: Decimal) -> Decimal:
+        multiplies an amount by a pre-quantized rate and rounds the result to cents
+    multiply_amounts(amounts, rates) -> list:
+        multiplies every amount by its pre-quantized rate (or every amount by the same rate), rounding each to cents
+
+Constants:
+----------
+    FLOAT_MODE: convert with float arithmetic (fast, tiny binary rounding error)
+    DECIMAL_MODE: convert with exact Decimal arithmetic
+    DECIMAL_CONTEXT: the Context every Decimal conversion uses (28 significant digits, round half up)
+    RATE_QUANTUM: how many decimal places a rate is kept to
+    AMOUNT_QUANTUM: how many decimal places a converted amount is rounded to
+
+"""
+
+__all__ = ['FLOAT_MODE', 'DECIMAL_MODE', 'DECIMAL_CONTEXT', 'RATE_QUANTUM', 'AMOUNT_QUANTUM', 'to_decimal',
+           'quantize_rate', 'multiply_amount', 'multiply_amounts']
+
+FLOAT_MODE = 'float'
+DECIMAL_MODE = 'decimal'
+DECIMAL_CONTEXT = Context(prec=28, rounding=ROUND_HALF_UP)
+RATE_QUANTUM = Decimal('0.000001')
+AMOUNT_QUANTUM = Decimal('0.01')
+
+
+def to_decimal(value) -> Decimal:
+    """
+    converts a rate or amount to a Decimal without picking up float representation error (a float goes through its
+    shortest repr, so 0.1 becomes Decimal('0.1') rather than 0.1000000000000000055511151231257827...)
+    :param value: a Decimal, str, int or float
+    :return: the Decimal
+    """
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def quantize_rate(value) -> Decimal:
+    """
+    converts a rate to a Decimal rounded to RATE_QUANTUM (done once per rate, at parse time)
+    :param value: a Decimal, str, int or float
+    :return: the quantized Decimal
+    """
+    return to_decimal(value).quantize(RATE_QUANTUM, context=DECIMAL_CONTEXT)
+
+
+def multiply_amount(amount, rate: Decimal) -> Decimal:
+    """
+    multiplies an amount by a pre-quantized rate and rounds the result to cents, all in DECIMAL_CONTEXT
+    :param amount: the amount to convert (Decimal, str, int or float)
+    :param rate: a rate from quantize_rate()
+    :return: the converted amount, rounded to AMOUNT_QUANTUM
+    """
+    # the context's own quantize, passing context= to Decimal.quantize costs about as much as the multiply
+    return DECIMAL_CONTEXT.quantize(DECIMAL_CONTEXT.multiply(to_decimal(amount), rate), AMOUNT_QUANTUM)
+
+
+def multiply_amounts(amounts, rates) -> list:
+    """
+    multiplies every amount by its pre-quantized rate (or every amount by the same rate) and rounds each result to
+    cents, all in DECIMAL_CONTEXT, with the same results as calling multiply_amount() on each
+    :param amounts: a sequence of amounts to convert (Decimals are used as is, anything else goes through to_decimal())
+    :param rates: a single rate from quantize_rate(), or a sequence of them the same length as amounts
+    :return: a list of converted amounts, rounded to AMOUNT_QUANTUM
+    """
+    amounts = [amount if type(amount) is Decimal else to_decimal(amount) for amount in amounts]
+    # the operators use the current context, so it's set once here rather than passed to every multiply and quantize
+    with localcontext(DECIMAL_CONTEXT):
+        if isinstance(rates, Decimal):
+            return [(amount * rates).quantize(AMOUNT_QUANTUM) for amount in amounts]
+        if len(rates) != len(amounts):
+            raise ValueError(f"Got {len(amounts)} amounts but {len(rates)} rates")
+        return [(amount * rate).quantize(AMOUNT_QUANTUM) for amount, rate in zip(amounts, rates)]
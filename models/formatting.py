@@ -0,0 +1,50 @@
+import functools
+
+"""
+The formatting module contains methods to turn conversions into display strings, kept apart from the numeric
+conversion so callers that only need numbers (batch jobs, the service layer) never pay for string building.
+
+Methods:
+--------
+    format_conversion(usd_amount: float, converted_amount: float, currency_name: str) -> str:
+        formats one conversion, e.g. "$100.00 USD = 94.00 Euro" (cached, the GUI tends to repeat itself)
+    format_conversions(usd_amounts, converted_amounts, currency_names) -> list:
+        formats a batch of conversions
+
+Constants:
+----------
+    FORMAT_CACHE_SIZE: how many formatted conversions format_conversion() remembers
+
+"""
+
+__all__ = ['FORMAT_CACHE_SIZE', 'format_conversion', 'format_conversions']
+
+FORMAT_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_conversion(usd_amount: float, converted_amount: float, currency_name: str) -> str:
+    """
+    formats one conversion, e.g. "$100.00 USD = 94.00 Euro" (cached, the same amount and currency are often formatted
+    more than once)
+    :param usd_amount: the USD amount that was converted
+    :param converted_amount: the result of Currency.convert_amount
+    :param currency_name: the currency converted to
+    :return: the display string
+    """
+    return f"${usd_amount:,.2f} USD = {converted_amount:,.2f} {currency_name}"
+
+
+def format_conversions(usd_amounts, converted_amounts, currency_names) -> list:
+    """
+    formats a batch of conversions the same way as format_conversion (without its cache, batches rarely repeat)
+    :param usd_amounts: the USD amounts that were converted
+    :param converted_amounts: the result of convert_batch()
+    :param currency_names: a single currency name, or one per amount
+    :return: a list of strings
+    """
+    if isinstance(currency_names, str):
+        return [f"${usd_amount:,.2f} USD = {converted:,.2f} {currency_names}"
+                for usd_amount, converted in zip(usd_amounts, converted_amounts)]
+    return [f"${usd_amount:,.2f} USD = {converted:,.2f} {currency_name}"
+            for usd_amount, converted, currency_name in zip(usd_amounts, converted_amounts, currency_names)]
@@ -0,0 +1,124 @@
+import sys
+from array import array
+from bisect import bisect_right
+from .currency import Currency
+
+"""
+The rate_history module contains a class to model every published exchange rate over time. Each currency (keyed by a
+(country name, currency name) tuple, since some countries publish more than one currency) gets a sorted list of ISO
+record dates and a parallel array('d') of rates, so the rate in effect on any date is a binary search away.
+
+The Treasury publishes around 170 rates a quarter, so the whole history since 2001 is a few tens of thousands of rows,
+a couple of megabytes at most laid out this way.
+
+Methods:
+--------
+    from_records(cls, records) -> RateHistory:
+        builds a history out of rate rows (dicts with record_date, country, currency and exchange_rate keys)
+    rate_on(self, key: tuple, day) -> float:
+        the rate in effect for a currency on a date (the latest one published on or before it)
+    currency_on(self, key: tuple, day) -> Currency:
+        the same rate, as a Currency object
+    currencies_on(self, day) -> list:
+        every currency with a rate in effect on a date, as Currency objects
+    history_for(self, key: tuple) -> list:
+        a currency's whole history as (record_date, rate) tuples
+
+"""
+
+__all__ = ['RateHistory']
+
+
+class RateHistory:
+    __slots__ = ('_dates', '_rates', '_record_count')
+
+    def __init__(self, dates, rates):
+        # use from_records(), this expects each key's dates already sorted with rates matching them
+        self._dates = dates
+        self._rates = rates
+        self._record_count = sum(len(key_dates) for key_dates in dates.values())
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        builds a history out of rate rows, in any order (if a date shows up twice for a currency the last row wins)
+        :param records: an iterable of dicts with record_date, country, currency and exchange_rate keys
+        :return: a RateHistory
+        """
+        grouped = {}
+        for record in records:
+            key = (sys.intern(record['country']), sys.intern(record['currency']))
+            grouped.setdefault(key, {})[sys.intern(record['record_date'])] = float(record['exchange_rate'])
+        dates, rates = {}, {}
+        for key, rates_by_date in grouped.items():
+            # record dates are ISO strings, so sorting them as strings sorts them chronologically
+            dates[key] = sorted(rates_by_date)
+            rates[key] = array('d', (rates_by_date[record_date] for record_date in dates[key]))
+        return cls(dates, rates)
+
+    def __contains__(self, key):
+        return key in self._dates
+
+    def __iter__(self):
+        return iter(self._dates)
+
+    def __len__(self):
+        return len(self._dates)
+
+    def __str__(self):
+        return f"RateHistory: {self._record_count} rates for {len(self._dates)} currencies"
+
+    def __repr__(self):
+        return f"RateHistory: {self._record_count} rates for {len(self._dates)} currencies"
+
+    @property
+    def record_count(self) -> int:
+        return self._record_count
+
+    def _position_on(self, key, day) -> int:
+        # the position of the latest record on or before day, -1 if the currency has none yet
+        return bisect_right(self._dates[key], day if isinstance(day, str) else day.isoformat()) - 1
+
+    def rate_on(self, key: tuple, day) -> float:
+        """
+        the rate in effect for a currency on a date, i.e. the latest one published on or before it
+        :param key: a (country name, currency name) tuple
+        :param day: a date, or an ISO formatted date string
+        :return: the rate
+        :raises KeyError: if there is no such currency, or it has no rate published on or before day
+        """
+        position = self._position_on(key, day)
+        if position < 0:
+            raise KeyError(f"No rate for {key} on or before {day}")
+        return self._rates[key][position]
+
+    def currency_on(self, key: tuple, day) -> Currency:
+        """
+        the rate in effect for a currency on a date, as a Currency object
+        :param key: a (country name, currency name) tuple
+        :param day: a date, or an ISO formatted date string
+        :return: a Currency object
+        :raises KeyError: if there is no such currency, or it has no rate published on or before day
+        """
+        return Currency(key[0], key[1], self.rate_on(key, day))
+
+    def currencies_on(self, day) -> list:
+        """
+        every currency with a rate in effect on a date (currencies first published after it are left out)
+        :param day: a date, or an ISO formatted date string
+        :return: a list of Currency objects
+        """
+        currencies = []
+        for key, key_rates in self._rates.items():
+            position = self._position_on(key, day)
+            if position >= 0:
+                currencies.append(Currency(key[0], key[1], key_rates[position]))
+        return currencies
+
+    def history_for(self, key: tuple) -> list:
+        """
+        a currency's whole history
+        :param key: a (country name, currency name) tuple
+        :return: a list of (record_date, rate) tuples, oldest first
+        """
+        return list(zip(self._dates[key], self._rates[key]))
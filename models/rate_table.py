@@ -0,0 +1,162 @@
+import sys
+from array import array
+from decimal import Decimal
+from collections.abc import Mapping
+from .currency import Currency
+from .decimal_math import quantize_rate
+
+"""
+The rate_table module contains a class to model a table of exchange rates stored column by column: record dates,
+countries and currency names in parallel lists of interned strings (so each repeated name is stored once) and the rates
+in a packed array('d') of doubles, alongside a column of the same rates as pre-quantized Decimals (quantized once, from
+the API's strings, for exact conversions). Rows are grouped by country, and an index maps each country to its range of
+rows.
+
+A RateTable is a read-only Mapping of country name -> list of Currency objects, so it can stand in for the plain
+dict of lists the GUI used to get, while history for every currency stays in a few hundred kilobytes.
+
+Methods:
+--------
+    from_records(cls, records) -> RateTable:
+        builds a table out of rate rows (dicts with record_date, country, currency and exchange_rate keys)
+    earliest_record_date(self) -> str:
+        the oldest record date of any rate in the table (None if it's empty)
+    latest_record_date(self) -> str:
+        the most recent record date of any rate in the table (None if it's empty)
+    row_range(self, country: str) -> range:
+        the rows holding a country's rates
+    rates_for(self, country: str) -> memoryview:
+        a country's rates, without copying them out of the rate column
+    rows(self, country: str) -> list:
+        a country's rows as (record_date, currency_name, rate) tuples
+    currency_name_at(self, row: int) -> str:
+        the currency name in a given row
+    decimal_rate_at(self, row: int) -> Decimal:
+        the pre-quantized Decimal rate in a given row
+    rate_column(self) -> memoryview:
+        the whole rate column (hand it to numpy.frombuffer() for a zero copy NumPy array)
+
+"""
+
+__all__ = ['RateTable']
+
+
+class RateTable(Mapping):
+    __slots__ = ('_record_dates', '_countries', '_currency_names', '_rates', '_decimal_rates', '_index')
+
+    def __init__(self, record_dates, countries, currency_names, rates, decimal_rates, index):
+        # use from_records(), this expects rows already grouped by country with index matching them
+        self._record_dates = record_dates
+        self._countries = countries
+        self._currency_names = currency_names
+        self._rates = rates
+        self._decimal_rates = decimal_rates
+        self._index = index
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        builds a table out of rate rows, grouping each country's rows together (in the order countries first appear)
+        :param records: an iterable of dicts with record_date, country, currency and exchange_rate keys
+        :return: a RateTable
+        """
+        grouped = {}
+        for record in records:
+            country_name = sys.intern(record['country'])
+            grouped.setdefault(country_name, []).append((sys.intern(record['record_date']),
+                                                         sys.intern(record['currency']),
+                                                         record['exchange_rate']))
+        record_dates, countries, currency_names, rates, decimal_rates, index = [], [], [], array('d'), [], {}
+        for country_name, country_rows in grouped.items():
+            start = len(rates)
+            for record_date, currency_name, rate in country_rows:
+                record_dates.append(record_date)
+                countries.append(country_name)
+                currency_names.append(currency_name)
+                rates.append(float(rate))
+                # quantized from the API's string here, once, rather than every time a lookup builds a Currency
+                decimal_rates.append(quantize_rate(rate))
+            index[country_name] = (start, len(rates))
+        return cls(record_dates, countries, currency_names, rates, decimal_rates, index)
+
+    def __getitem__(self, country):
+        start, stop = self._index[country]
+        return [Currency(country, self._currency_names[row], self._rates[row], self._decimal_rates[row])
+                for row in range(start, stop)]
+
+    def __contains__(self, country):
+        return country in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __str__(self):
+        return f"RateTable: {len(self._rates)} rates for {len(self._index)} countries"
+
+    def __repr__(self):
+        return f"RateTable: {len(self._rates)} rates for {len(self._index)} countries"
+
+    @property
+    def row_count(self) -> int:
+        return len(self._rates)
+
+    @property
+    def earliest_record_date(self) -> str:
+        return min(self._record_dates, default=None)
+
+    @property
+    def latest_record_date(self) -> str:
+        # record dates are ISO strings, so the greatest string is the latest date
+        return max(self._record_dates, default=None)
+
+    def row_range(self, country: str) -> range:
+        """
+        the rows holding a country's rates
+        :param country: country name
+        :return: a range of row numbers
+        """
+        return range(*self._index[country])
+
+    def rates_for(self, country: str) -> memoryview:
+        """
+        a country's rates, without copying them out of the rate column
+        :param country: country name
+        :return: a memoryview of doubles
+        """
+        start, stop = self._index[country]
+        return memoryview(self._rates)[start:stop]
+
+    def rows(self, country: str) -> list:
+        """
+        a country's rows as (record_date, currency_name, rate) tuples
+        :param country: country name
+        :return: a list of tuples
+        """
+        return [(self._record_dates[row], self._currency_names[row], self._rates[row])
+                for row in self.row_range(country)]
+
+    def currency_name_at(self, row: int) -> str:
+        """
+        the currency name in a given row
+        :param row: row number
+        :return: the currency name
+        """
+        return self._currency_names[row]
+
+    def decimal_rate_at(self, row: int) -> Decimal:
+        """
+        the pre-quantized Decimal rate in a given row (for exact conversions, see decimal_math)
+        :param row: row number
+        :return: the rate, quantized to decimal_math.RATE_QUANTUM
+        """
+        return self._decimal_rates[row]
+
+    def rate_column(self) -> memoryview:
+        """
+        the whole rate column (hand it to numpy.frombuffer() for a zero copy NumPy array)
+        :return: a memoryview of doubles
+        """
+        return memoryview(self._rates)
@@ -0,0 +1,109 @@
+import io
+import json
+import logging
+import random
+import pytest
+import requests
+
+# before the app is imported: logging_config's basicConfig() only sets up logs/app.log if nothing else has configured
+# logging, and test runs shouldn't end up in the app's log (caplog still sees every record)
+logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+import business
+import dal
+from business import currency_service
+from dal import dal as dal_module
+from dal import rate_store
+from requests.structures import CaseInsensitiveDict
+
+"""
+Shared fixtures: a stub Treasury API that pages and filters rows the way the real one does, served through the DAL's
+session so every layer above it runs for real, and a throwaway rate store so nothing leaks between tests.
+"""
+
+
+class StubTreasuryApi:
+    """
+    Serves rate rows like the rates of exchange endpoint: filter on record_date (eq, or a gte/lte range), sorted on the
+    sort fields (rows the sort doesn't tell apart come back in a different order every request, as from a database),
+    paged with page[number]/page[size], and a meta block with total-pages. Bodies come back as real
+    requests.Response objects, unread when stream=True, so streaming behaves as it does against the network.
+    """
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.requests = []
+        self.responses = []
+        self.status_code = 200
+        self.body = None  # if set, served as is instead of a page of rows
+
+    def get(self, url, params=None, headers=None, stream=False, timeout=None):
+        self.requests.append(dict(params or {}))
+        if self.body is not None:
+            return self._response(self.status_code, self.body, stream)
+        rows = self._sorted(self._filtered(params.get('filter')), params.get('sort', ''))
+        page_number, page_size = int(params['page[number]']), int(params['page[size]'])
+        total_pages = max(-(-len(rows) // page_size), 1)
+        page = rows[(page_number - 1) * page_size:page_number * page_size]
+        meta = {'count': len(page), 'total-count': len(rows), 'total-pages': total_pages}
+        return self._response(self.status_code, json.dumps({'data': page, 'meta': meta}).encode(), stream)
+
+    def _filtered(self, row_filter):
+        rows = self.rows
+        for condition in (row_filter.split(',') if row_filter else []):
+            field, operator, value = condition.split(':')
+            compare = {'eq': str.__eq__, 'gte': str.__ge__, 'lte': str.__le__}[operator]
+            rows = [row for row in rows if compare(row[field], value)]
+        return rows
+
+    @staticmethod
+    def _sorted(rows, sort):
+        rows = random.sample(rows, len(rows))
+        # sorted field by field from the last, each sort is stable so the earlier fields take precedence
+        for field in reversed([field for field in sort.split(',') if field]):
+            rows.sort(key=lambda row: row[field.lstrip('-')], reverse=field.startswith('-'))
+        return rows
+
+    def _response(self, status_code, body, stream):
+        response = requests.Response()
+        self.responses.append(response)
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+        response.raw = io.BytesIO(body)
+        response.encoding = 'utf-8'
+        if not stream:
+            response.content  # read it now, like requests does without stream=True
+        return response
+
+
+def build_rows(record_date, count, first=0):
+    """
+    count rate rows for record_date, one currency per country
+    """
+    return [{'record_date': record_date, 'country': f"C{number}", 'currency': f"Cur{number}",
+             'exchange_rate': f"{1 + number / 100:.3f}"} for number in range(first, first + count)]
+
+
+@pytest.fixture
+def make_rows():
+    return build_rows
+
+
+@pytest.fixture
+def treasury_api(monkeypatch, tmp_path):
+    api = StubTreasuryApi()
+    monkeypatch.setattr(dal_module, 'get_session', lambda: api)
+    monkeypatch.setattr(dal_module, 'treasury_breaker', dal.CircuitBreaker('Stub Treasury API'))
+    monkeypatch.setattr(dal, 'treasury_breaker', dal_module.treasury_breaker)
+    monkeypatch.setattr(rate_store, 'DB_PATH', str(tmp_path / 'rates.db'))
+    monkeypatch.setattr(rate_store, '_schema_ready', False)
+    dal.forget_validators()
+    business.clear_currency_cache()
+    currency_service._last_parsed.clear()
+    monkeypatch.setattr(currency_service, '_last_good_currency_dict', None)
+    monkeypatch.setattr(currency_service, '_serving_stale', False)
+    monkeypatch.setattr(currency_service, '_probe_timer', None)
+    monkeypatch.setattr(currency_service, '_probe_attempts', 0)
+    yield api
+    business.clear_currency_cache()
+    currency_service._last_parsed.clear()
@@ -0,0 +1,128 @@
+import asyncio
+import time
+import pytest
+import business
+import dal
+from business import currency_service
+from dal import dal as dal_module
+from exceptions import CircuitOpenException
+
+RESET_TIMEOUT = 0.05
+
+
+@pytest.fixture
+def breaker():
+    return dal.CircuitBreaker('Test API', failure_threshold=2, reset_timeout=RESET_TIMEOUT)
+
+
+def open_circuit(breaker):
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == dal.OPEN
+
+
+def test_lost_probe_does_not_wedge_the_circuit(breaker):
+    open_circuit(breaker)
+    time.sleep(RESET_TIMEOUT)
+    # the probe goes out but is never recorded, as when its task is cancelled mid request
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    time.sleep(RESET_TIMEOUT)
+    assert breaker.allow_request()
+    assert breaker.state == dal.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == dal.CLOSED
+
+
+def test_opens_after_failure_threshold_in_a_row(breaker):
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == dal.CLOSED
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == dal.OPEN
+    assert not breaker.allow_request()
+    assert 0 < breaker.seconds_until_retry() <= RESET_TIMEOUT
+
+
+def test_half_open_lets_one_probe_through(breaker):
+    open_circuit(breaker)
+    time.sleep(RESET_TIMEOUT)
+    assert breaker.seconds_until_retry() == 0
+    assert breaker.allow_request()
+    assert breaker.state == dal.HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_probe_success_closes(breaker):
+    open_circuit(breaker)
+    time.sleep(RESET_TIMEOUT)
+    breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == dal.CLOSED
+    # the failure count starts over
+    breaker.record_failure()
+    assert breaker.state == dal.CLOSED
+
+
+def test_probe_failure_reopens(breaker):
+    open_circuit(breaker)
+    time.sleep(RESET_TIMEOUT)
+    breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == dal.OPEN
+    assert not breaker.allow_request()
+    time.sleep(RESET_TIMEOUT)
+    assert breaker.allow_request()
+
+
+@pytest.fixture
+def treasury_breaker(treasury_api, monkeypatch):
+    treasury_breaker = dal.CircuitBreaker('Stub Treasury API', failure_threshold=1, reset_timeout=RESET_TIMEOUT)
+    monkeypatch.setattr(dal_module, 'treasury_breaker', treasury_breaker)
+    monkeypatch.setattr(dal, 'treasury_breaker', treasury_breaker)
+    monkeypatch.setattr(dal_module, 'backoff_delay', lambda attempt: 0)
+    return treasury_breaker
+
+
+def test_cancelled_probe_request_does_not_wedge_the_circuit(treasury_api, treasury_breaker, make_rows):
+    treasury_api.rows = make_rows('2023-09-30', 5)
+    treasury_api.status_code = 503
+    dal.fetch_treasury_data('2023-09-30')
+    assert treasury_breaker.state == dal.OPEN
+    time.sleep(RESET_TIMEOUT)
+
+    def cancelled(*args, **kwargs):
+        raise asyncio.CancelledError
+    # the probe's task is cancelled mid request, so it's never recorded as a success or a failure
+    treasury_api.get = cancelled
+    with pytest.raises(asyncio.CancelledError):
+        dal.fetch_treasury_data('2023-09-30')
+    del treasury_api.get
+    treasury_api.status_code = 200
+    with pytest.raises(CircuitOpenException):
+        dal.fetch_treasury_data('2023-09-30')
+    time.sleep(RESET_TIMEOUT)
+    assert dal.fetch_treasury_data('2023-09-30').status_code == 200
+    assert treasury_breaker.state == dal.CLOSED
+
+
+def test_stale_rates_are_served_while_the_circuit_is_open(treasury_api, treasury_breaker, monkeypatch, make_rows):
+    monkeypatch.setattr(currency_service, '_schedule_recovery_probe', lambda: None)
+    treasury_api.rows = make_rows(currency_service.find_last_quarter_iso(), 10)
+    good_rates = business.get_currency_data()
+    treasury_api.status_code = 503
+    assert business.refresh_currency_data() is good_rates
+    assert business.is_serving_stale()
+    assert treasury_breaker.state == dal.OPEN
+    # failing fast, the API isn't asked again until the circuit lets a probe through
+    request_count = len(treasury_api.requests)
+    assert business.refresh_currency_data() is good_rates
+    assert len(treasury_api.requests) == request_count
+    time.sleep(RESET_TIMEOUT)
+    treasury_api.status_code = 200
+    currency_service._run_recovery_probe()
+    assert treasury_breaker.state == dal.CLOSED
+    assert not business.is_serving_stale()
+    assert len(business.get_cached_currency_data()) == 10
@@ -0,0 +1,66 @@
+import pytest
+import business
+import models
+from business import cross_rate_service
+from exceptions import BusinessLogicException
+
+EURO = ('Euro Zone', 'Euro')
+YEN = ('Japan', 'Yen')
+POUND = ('United Kingdom', 'Pound')
+
+
+@pytest.fixture
+def rate_table():
+    cross_rate_service.clear_cross_rates()
+    yield models.RateTable.from_records([
+        {'record_date': '2023-09-30', 'country': country, 'currency': currency, 'exchange_rate': rate}
+        for (country, currency), rate in [(EURO, '0.8'), (YEN, '150.0'), (POUND, '0.5'), (('Atlantis', 'Shell'), '0')]])
+    cross_rate_service.clear_cross_rates()
+
+
+@pytest.fixture
+def cross_rates(rate_table):
+    return business.get_cross_rates(rate_table)
+
+
+def test_every_currency_and_the_dollar_is_in_the_matrix(cross_rates):
+    assert cross_rates.keys == [business.USD_KEY, EURO, YEN, POUND]
+    assert len(cross_rates) == 4
+    # nothing can be converted out of a rate of zero
+    assert ('Atlantis', 'Shell') not in cross_rates
+
+
+def test_cross_rate_is_the_ratio_of_dollar_rates(cross_rates):
+    assert cross_rates.rate(EURO, YEN) == pytest.approx(150.0 / 0.8)
+    assert cross_rates.rate(YEN, EURO) == pytest.approx(0.8 / 150.0)
+    assert cross_rates.rate(business.USD_KEY, POUND) == pytest.approx(0.5)
+    assert cross_rates.rate(POUND, POUND) == 1
+
+
+def test_round_trip_comes_back_to_the_amount(cross_rates):
+    there = cross_rates.convert(100.0, EURO, YEN)
+    assert there == pytest.approx(18750.0)
+    assert cross_rates.convert(there, YEN, EURO) == pytest.approx(100.0)
+
+
+def test_rates_from_is_a_row_of_the_matrix(cross_rates):
+    row = cross_rates.rates_from(POUND)
+    assert list(row) == pytest.approx([2.0, 1.6, 300.0, 1.0])
+    assert row[cross_rates.index_of(YEN)] == cross_rates.rate(POUND, YEN)
+
+
+def test_convert_many(cross_rates):
+    assert list(cross_rates.convert_many([1.0, 2.0, 10.0], EURO, POUND)) == pytest.approx([0.625, 1.25, 6.25])
+
+
+def test_unknown_currency(cross_rates):
+    with pytest.raises(KeyError):
+        cross_rates.rate(EURO, ('Atlantis', 'Shell'))
+
+
+def test_convert_pair_takes_currencies_or_keys(rate_table):
+    euro = rate_table['Euro Zone'][0]
+    assert business.convert_pair(8.0, euro, POUND, rate_table) == pytest.approx(5.0)
+    assert business.convert_pair(8.0, list(EURO), POUND, rate_table) == pytest.approx(5.0)
+    with pytest.raises(BusinessLogicException):
+        business.convert_pair(1.0, EURO, ('Atlantis', 'Shell'), rate_table)
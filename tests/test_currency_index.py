@@ -0,0 +1,62 @@
+import pytest
+import business
+import models
+from business import lookup_service
+from exceptions import BusinessLogicException
+
+
+@pytest.fixture
+def rate_table():
+    lookup_service.clear_currency_index()
+    yield models.RateTable.from_records([
+        {'record_date': '2023-09-30', 'country': country, 'currency': currency, 'exchange_rate': rate}
+        for country, currency, rate in [('Euro Zone', 'Euro', '0.944'), ('France', 'Euro', '0.944'),
+                                        ('Japan', 'Yen', '149.3'), ('Canada', 'Dollar', '1.35'),
+                                        ('Cuba', 'Chavito', '1.0'), ('Cuba', 'Peso', '24.0'),
+                                        ('Atlantis', 'Shell', '3.0')]])
+    lookup_service.clear_currency_index()
+
+
+@pytest.fixture
+def currency_index(rate_table):
+    return business.get_currency_index(rate_table)
+
+
+@pytest.mark.parametrize('code', ['JPY', 'jpy', ' Jpy '])
+def test_code_lookup_ignores_case_and_spacing(currency_index, code):
+    assert [currency.country_name for currency in currency_index.by_code(code)] == ['Japan']
+
+
+def test_countries_sharing_a_code_are_all_found(currency_index):
+    assert [currency.country_name for currency in currency_index.by_code('EUR')] == ['Euro Zone', 'France']
+
+
+def test_a_country_with_two_currencies_has_two_codes(currency_index):
+    assert [currency.currency_name for currency in currency_index.by_country('cuba')] == ['Chavito', 'Peso']
+    assert [currency.currency_name for currency in currency_index.by_code('CUC')] == ['Chavito']
+    assert [currency.currency_name for currency in currency_index.by_code('CUP')] == ['Peso']
+
+
+def test_codes(currency_index, rate_table):
+    assert currency_index.codes == ['CAD', 'CUC', 'CUP', 'EUR', 'JPY']
+    # a fresh lookup from the table is equal to the indexed Currency, so it finds the same code
+    assert currency_index.iso_code_of(rate_table['France'][0]) == 'EUR'
+    assert currency_index.iso_code_of(rate_table['Atlantis'][0]) is None
+
+
+def test_currency_without_a_code_is_still_indexed_by_name(currency_index):
+    assert currency_index.by_code('XXX') == ()
+    assert [currency.country_name for currency in currency_index.by_currency_name('shell')] == ['Atlantis']
+
+
+def test_find_tries_code_then_currency_name_then_country(currency_index):
+    assert [currency.country_name for currency in currency_index.find('eur')] == ['Euro Zone', 'France']
+    assert [currency.country_name for currency in currency_index.find('Dollar')] == ['Canada']
+    assert [currency.currency_name for currency in currency_index.find('JAPAN')] == ['Yen']
+    assert currency_index.find('Narnia') == ()
+
+
+def test_find_currency_by_code(rate_table):
+    assert business.find_currency_by_code('cad', rate_table).conversion_rate == 1.35
+    with pytest.raises(BusinessLogicException):
+        business.find_currency_by_code('GBP', rate_table)
@@ -0,0 +1,67 @@
+import pickle
+from decimal import Decimal
+import pytest
+import business
+import models
+from models import currency as currency_module
+
+
+@pytest.fixture
+def quantize_calls(monkeypatch):
+    calls = []
+
+    def counting_quantize(value):
+        calls.append(value)
+        return models.quantize_rate(value)
+    monkeypatch.setattr(currency_module, 'quantize_rate', counting_quantize)
+    return calls
+
+
+@pytest.fixture
+def rate_table():
+    return models.RateTable.from_records([
+        {'record_date': '2023-09-30', 'country': 'Euro Zone', 'currency': 'Euro', 'exchange_rate': '0.9440004'},
+        {'record_date': '2023-09-30', 'country': 'Japan', 'currency': 'Yen', 'exchange_rate': '149.3'}])
+
+
+def test_table_lookups_reuse_the_quantized_rate(rate_table, quantize_calls):
+    euro = rate_table['Euro Zone'][0]
+    assert euro.decimal_rate == Decimal('0.944000')
+    assert euro.convert_amount(Decimal('100'), models.DECIMAL_MODE) == Decimal('94.40')
+    assert rate_table['Euro Zone'][0].decimal_rate is euro.decimal_rate
+    assert quantize_calls == []
+
+
+def test_float_rate_is_quantized_on_first_decimal_use(quantize_calls):
+    yen = models.Currency('Japan', 'Yen', 149.3)
+    assert yen.convert_amount(2.5) == pytest.approx(373.25)
+    assert quantize_calls == []
+    assert yen.convert_amount('2.5', models.DECIMAL_MODE) == Decimal('373.25')
+    yen.convert_amount('3', models.DECIMAL_MODE)
+    assert quantize_calls == [149.3]
+
+
+def test_decimal_batch_matches_one_at_a_time():
+    euro = models.Currency('Euro Zone', 'Euro', '0.944')
+    amounts = [Decimal('0.01'), Decimal('10.55'), '1234.565', 7, 0.1]
+    assert euro.convert_many(amounts, models.DECIMAL_MODE) == [
+        euro.convert_amount(amount, models.DECIMAL_MODE) for amount in amounts]
+
+
+def test_decimal_batch_at_table_rates(rate_table):
+    converted, strings = business.convert_table_rows([Decimal('100'), Decimal('2')], rate_table, [0, 1],
+                                                     formatted=True, mode=models.DECIMAL_MODE)
+    assert converted == [Decimal('94.40'), Decimal('298.60')]
+    assert strings == ['$100.00 USD = 94.40 Euro', '$2.00 USD = 298.60 Yen']
+
+
+def test_decimal_batch_into_several_currencies(rate_table):
+    currencies = [rate_table['Japan'][0], rate_table['Euro Zone'][0]]
+    assert business.convert_amounts(['1', '1'], currencies, mode=models.DECIMAL_MODE) == [
+        Decimal('149.30'), Decimal('0.94')]
+
+
+def test_pickled_currency_keeps_its_decimal_rate(rate_table):
+    euro = pickle.loads(pickle.dumps(rate_table['Euro Zone'][0]))
+    assert euro.decimal_rate == Decimal('0.944000')
+    assert euro.conversion_rate == 0.9440004
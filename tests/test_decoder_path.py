@@ -0,0 +1,30 @@
+import pytest
+import business
+from exceptions import BusinessLogicException
+from business import currency_service, treasury_decoder
+
+
+@pytest.fixture
+def decoded_bodies(monkeypatch):
+    bodies = []
+    default_decode = treasury_decoder.get_json_decoder()
+
+    def counting_decode(body):
+        bodies.append(body)
+        return default_decode(body)
+    monkeypatch.setitem(treasury_decoder._decoders, 'counting', counting_decode)
+    monkeypatch.setattr(treasury_decoder, '_default_decoder_name', 'counting')
+    return bodies
+
+
+def test_quarter_pages_go_through_the_decoder(treasury_api, decoded_bodies, make_rows):
+    row_count = currency_service.QUARTER_PAGE_SIZE + 50
+    treasury_api.rows = make_rows(currency_service.find_last_quarter_iso(), row_count)
+    assert len(business.get_currency_data()) == row_count
+    assert len(decoded_bodies) == 2
+
+
+def test_malformed_page_is_a_business_error(treasury_api):
+    treasury_api.body = b'{"data": [{"country": "C1"}], "meta": {"total-pages": 1}}'
+    with pytest.raises(BusinessLogicException):
+        business.get_currency_data()
@@ -0,0 +1,26 @@
+import pytest
+import business
+from exceptions import BusinessLogicException
+from business import history_service
+
+
+@pytest.fixture
+def rate_history_cache():
+    business.clear_rate_history()
+    yield
+    business.clear_rate_history()
+
+
+def test_history_spans_every_page(treasury_api, rate_history_cache, make_rows):
+    quarters = [f"{year}-{month}" for year in range(2001, 2021) for month in ('03-31', '06-30', '09-30', '12-31')]
+    treasury_api.rows = [row for quarter in quarters for row in make_rows(quarter, 170)]
+    rate_history = business.get_rate_history()
+    assert rate_history.record_count == 80 * 170
+    assert len(treasury_api.requests) == -(-80 * 170 // history_service.HISTORY_PAGE_SIZE)
+    assert business.convert_on(100, 'C1', 'Cur1', '2005-07-15') == '$100.00 USD = 101.00 Cur1'
+
+
+def test_history_lookup_before_first_rate_fails(treasury_api, rate_history_cache, make_rows):
+    treasury_api.rows = make_rows('2010-03-31', 5)
+    with pytest.raises(BusinessLogicException):
+        business.convert_on(100, 'C1', 'Cur1', '2009-12-31')
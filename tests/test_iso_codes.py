@@ -0,0 +1,19 @@
+import pytest
+from business import find_iso_code, normalise_key
+
+
+@pytest.mark.parametrize('name', ["Cote D'Ivoire", 'cote d ivoire', 'COTE DIVOIRE', 'Cote d’Ivoire', ' cote-d-ivoire '])
+def test_spellings_normalise_alike(name):
+    assert normalise_key(name) == 'cote divoire'
+
+
+def test_ampersand_and_and():
+    assert normalise_key('Trinidad & Tobago') == normalise_key('trinidad and tobago')
+
+
+@pytest.mark.parametrize('country_name, currency_name, code', [
+    ('Euro Zone', 'Euro', 'EUR'), ('France', 'Euro', 'EUR'), ("Cote D'Ivoire", 'CFA Franc', 'XOF'),
+    ('Cameroon', 'CFA Franc', 'XAF'), ('Antigua & Barbuda', 'East Caribbean Dollar', 'XCD'),
+    ('Cuba', 'Chavito', 'CUC'), ('Cuba', 'Peso', 'CUP'), ('Japan', 'Yen', 'JPY'), ('Atlantis', 'Shell', None)])
+def test_find_iso_code(country_name, currency_name, code):
+    assert find_iso_code(country_name, currency_name) == code
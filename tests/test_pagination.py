@@ -0,0 +1,56 @@
+import itertools
+import time
+import business
+import dal
+from business import currency_service
+
+
+def test_streamed_pages_are_all_fetched(treasury_api, make_rows):
+    treasury_api.rows = make_rows('2024-06-30', 450)
+    records = [record for response in dal.fetch_treasury_pages(stream=True)
+               for record in business.iter_treasury_records(response)]
+    assert len(records) == 450
+    assert len(treasury_api.requests) == 3
+
+
+def test_get_currency_data_reads_every_page(treasury_api, make_rows):
+    quarter_iso = currency_service.find_last_quarter_iso()
+    row_count = 2 * currency_service.QUARTER_PAGE_SIZE + 50
+    treasury_api.rows = make_rows(quarter_iso, row_count)
+    currency_dict = business.get_currency_data()
+    assert len(currency_dict) == row_count
+    assert len(treasury_api.requests) == 3
+
+
+def test_rows_sharing_a_date_are_each_fetched_once(treasury_api, make_rows):
+    treasury_api.rows = make_rows('2024-06-30', 450)
+    pages = dal.fetch_treasury_pages('2024-06-30')
+    countries = [row['country'] for response in pages for row in response.json()['data']]
+    assert sorted(countries) == sorted(row['country'] for row in treasury_api.rows)
+
+
+def test_streamed_pages_are_fetched_no_faster_than_they_are_read(treasury_api, make_rows):
+    treasury_api.rows = make_rows('2024-06-30', 100)
+    pages = dal.fetch_treasury_pages(page_size=10, max_workers=2, stream=True)
+    next(pages)
+    held_page = next(pages)
+    time.sleep(0.2)
+    # the first page and the two later ones max_workers allows, one of which the caller is still holding unread
+    assert len(treasury_api.requests) == 3
+    records = [record for response in itertools.chain([held_page], pages)
+               for record in business.iter_treasury_records(response)]
+    assert len(records) == 90
+    assert len(treasury_api.requests) == 10
+
+
+def test_pages_left_unread_are_closed(treasury_api, make_rows):
+    treasury_api.rows = make_rows('2024-06-30', 100)
+    pages = dal.fetch_treasury_pages(page_size=10, max_workers=3, stream=True)
+    next(pages)
+    held_page = next(pages)
+    # let the rest of the window arrive, so there are fetched pages nobody is going to read
+    time.sleep(0.2)
+    pages.close()
+    unread_pages = [response for response in treasury_api.responses[1:] if response is not held_page]
+    assert len(unread_pages) == 2
+    assert all(response.raw.closed for response in unread_pages)
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from datetime import timedelta
+import business
+from business import currency_service
+
+
+@pytest.fixture
+def quarters(treasury_api, monkeypatch):
+    # keep the tests inside the grace period whatever day they run on
+    monkeypatch.setattr(currency_service, 'QUARTER_GRACE_PERIOD', timedelta(days=3650))
+    quarter_date = currency_service.find_last_quarter_date()
+    return quarter_date.isoformat(), currency_service.find_fallback_start(quarter_date).isoformat()
+
+
+def record_dates(currency_dict):
+    return [record_date for country in currency_dict for record_date, _, _ in currency_dict.rows(country)]
+
+
+def test_select_quarter_rows_keeps_latest_rate_per_currency(quarters, make_rows):
+    quarter_iso, previous_iso = quarters
+    rows = make_rows(quarter_iso, 2) + make_rows(previous_iso, 4) + make_rows('1999-12-31', 6)
+    selected = currency_service.select_quarter_rows(rows, quarter_iso)
+    assert sorted((row['country'], row['record_date']) for row in selected) == [
+        ('C0', quarter_iso), ('C1', quarter_iso), ('C2', previous_iso), ('C3', previous_iso)]
+
+
+def test_partly_published_quarter_is_rechecked(treasury_api, quarters, make_rows):
+    quarter_iso, previous_iso = quarters
+    treasury_api.rows = make_rows(previous_iso, 60) + make_rows(quarter_iso, 30)
+    currency_dict = business.get_cached_currency_data()
+    assert len(currency_dict) == 60
+    assert record_dates(currency_dict).count(quarter_iso) == 30
+    # inside the retry interval the partial rates are served without asking again
+    request_count = len(treasury_api.requests)
+    assert business.get_cached_currency_data() is currency_dict
+    assert len(treasury_api.requests) == request_count
+    treasury_api.rows += make_rows(quarter_iso, 30, first=30)
+    currency_dict = business.get_cached_currency_data(retry_interval=timedelta(0))
+    assert record_dates(currency_dict) == [quarter_iso] * 60
+    # complete now, so it's kept for the rest of the quarter
+    request_count = len(treasury_api.requests)
+    assert business.get_cached_currency_data(retry_interval=timedelta(0)) is currency_dict
+    assert len(treasury_api.requests) == request_count
+
+
+def test_partly_stored_quarter_goes_back_to_the_api(treasury_api, quarters, make_rows):
+    quarter_iso, previous_iso = quarters
+    treasury_api.rows = make_rows(previous_iso, 60) + make_rows(quarter_iso, 30)
+    business.get_cached_currency_data()
+    # a restart: only the local rate store survives
+    business.clear_currency_cache()
+    currency_service._last_parsed.clear()
+    treasury_api.rows += make_rows(quarter_iso, 30, first=30)
+    request_count = len(treasury_api.requests)
+    currency_dict = business.get_cached_currency_data()
+    assert len(treasury_api.requests) > request_count
+    assert record_dates(currency_dict) == [quarter_iso] * 60
+    # and once the whole quarter is stored, the next start doesn't need the API at all
+    business.clear_currency_cache()
+    currency_service._last_parsed.clear()
+    request_count = len(treasury_api.requests)
+    assert record_dates(business.get_cached_currency_data()) == [quarter_iso] * 60
+    assert len(treasury_api.requests) == request_count
+
+
+def test_quarter_and_fallback_rates_come_in_one_request(treasury_api, quarters, make_rows):
+    quarter_iso, previous_iso = quarters
+    treasury_api.rows = make_rows(previous_iso, 170) + make_rows(quarter_iso, 170)
+    assert record_dates(business.get_currency_data()) == [quarter_iso] * 170
+    assert len(treasury_api.requests) == 1
+
+
+def test_async_quarter_load_is_one_request(treasury_api, quarters, make_rows):
+    quarter_iso, previous_iso = quarters
+    treasury_api.rows = make_rows(previous_iso, 170) + make_rows(quarter_iso, 170)
+    assert len(asyncio.run(business.get_currency_data_async())) == 170
+    assert len(treasury_api.requests) == 1
+
+
+def test_async_partly_published_quarter_is_rechecked(treasury_api, quarters, monkeypatch, make_rows):
+    quarter_iso, previous_iso = quarters
+    treasury_api.rows = make_rows(previous_iso, 60) + make_rows(quarter_iso, 30)
+    currency_dict = asyncio.run(business.get_currency_data_async())
+    assert record_dates(currency_dict).count(quarter_iso) == 30
+    # inside the retry interval the partial rates are served, by either service, without asking again
+    request_count = len(treasury_api.requests)
+    assert asyncio.run(business.get_currency_data_async()) is currency_dict
+    assert business.get_cached_currency_data() is currency_dict
+    assert len(treasury_api.requests) == request_count
+    treasury_api.rows += make_rows(quarter_iso, 30, first=30)
+    monkeypatch.setattr(currency_service, 'GRACE_RETRY_INTERVAL', timedelta(0))
+    currency_dict = asyncio.run(business.get_currency_data_async())
+    assert record_dates(currency_dict) == [quarter_iso] * 60
+    assert business.peek_cached_currency_data(currency_service.find_last_quarter_date()) is currency_dict
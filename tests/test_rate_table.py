@@ -0,0 +1,63 @@
+from decimal import Decimal
+import pytest
+import models
+
+
+@pytest.fixture
+def rate_table(make_rows):
+    # two quarters, interleaved the way the API sends them back, newest first
+    return models.RateTable.from_records(make_rows('2023-12-31', 3) + make_rows('2023-09-30', 2))
+
+
+def test_rows_are_grouped_by_country(rate_table):
+    assert list(rate_table) == ['C0', 'C1', 'C2']
+    assert len(rate_table) == 3
+    assert rate_table.row_count == 5
+    assert rate_table.row_range('C0') == range(0, 2)
+    assert rate_table.row_range('C2') == range(4, 5)
+    assert rate_table.rows('C1') == [('2023-12-31', 'Cur1', 1.01), ('2023-09-30', 'Cur1', 1.01)]
+
+
+def test_lookup_builds_currencies(rate_table):
+    currencies = rate_table['C1']
+    assert [currency.currency_name for currency in currencies] == ['Cur1', 'Cur1']
+    assert currencies[0].conversion_rate == 1.01
+    assert currencies[0].decimal_rate == Decimal('1.010000')
+    assert 'C1' in rate_table
+    assert 'Atlantis' not in rate_table
+    with pytest.raises(KeyError):
+        rate_table['Atlantis']
+
+
+def test_rate_columns(rate_table):
+    assert list(rate_table.rates_for('C0')) == [1.0, 1.0]
+    assert rate_table.rate_column().tolist() == [1.0, 1.0, 1.01, 1.01, 1.02]
+    assert rate_table.currency_name_at(4) == 'Cur2'
+    assert rate_table.decimal_rate_at(4) == Decimal('1.020000')
+
+
+def test_rates_for_does_not_copy(rate_table):
+    rates = rate_table.rates_for('C2')
+    assert rates.obj is rate_table.rate_column().obj
+
+
+def test_record_date_bounds(rate_table):
+    assert rate_table.earliest_record_date == '2023-09-30'
+    assert rate_table.latest_record_date == '2023-12-31'
+
+
+def test_empty_table():
+    rate_table = models.RateTable.from_records([])
+    assert len(rate_table) == 0
+    assert rate_table.row_count == 0
+    assert rate_table.earliest_record_date is None
+    assert rate_table.latest_record_date is None
+
+
+def test_repeated_names_are_stored_once(make_rows):
+    rows = make_rows('2023-12-31', 2) + make_rows('2023-09-30', 2)
+    # build the strings afresh so equal names start out as different objects
+    rows = [{key: ''.join(value) for key, value in row.items()} for row in rows]
+    rate_table = models.RateTable.from_records(rows)
+    first, second = rate_table.row_range('C0')
+    assert rate_table.currency_name_at(first) is rate_table.currency_name_at(second)
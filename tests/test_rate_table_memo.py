@@ -0,0 +1,42 @@
+import pytest
+import business
+import models
+from business import cross_rate_service, lookup_service, search_index
+
+DERIVED = [(cross_rate_service.get_cross_rates, cross_rate_service.clear_cross_rates),
+           (lookup_service.get_currency_index, lookup_service.clear_currency_index),
+           (search_index.get_search_index, search_index.clear_search_index)]
+
+
+@pytest.fixture(params=DERIVED, ids=lambda derived: derived[0].__name__)
+def derived(request):
+    get, clear = request.param
+    clear()
+    yield get, clear
+    clear()
+
+
+def test_built_once_per_rate_table(derived, make_rows):
+    get, _ = derived
+    rate_table = models.RateTable.from_records(make_rows('2023-09-30', 5))
+    assert get(rate_table) is get(rate_table)
+
+
+def test_rebuilt_for_another_rate_table(derived, make_rows):
+    get, _ = derived
+    first = get(models.RateTable.from_records(make_rows('2023-09-30', 5)))
+    assert get(models.RateTable.from_records(make_rows('2023-12-31', 5))) is not first
+
+
+def test_clear_drops_the_memo(derived, make_rows):
+    get, clear = derived
+    rate_table = models.RateTable.from_records(make_rows('2023-09-30', 5))
+    first = get(rate_table)
+    clear()
+    assert get(rate_table) is not first
+
+
+def test_defaults_to_current_quarter(treasury_api, make_rows):
+    treasury_api.rows = make_rows(business.find_last_quarter_iso(), 5)
+    assert lookup_service.get_currency_index() is lookup_service.get_currency_index(
+        business.get_cached_currency_data())
@@ -0,0 +1,94 @@
+import threading
+import pytest
+import business
+from business import currency_service
+
+
+class RecordingTimer:
+    """
+    Stands in for threading.Timer, remembering the delays instead of running anything
+    """
+    delays = []
+
+    def __init__(self, delay, function):
+        self.delays.append(delay)
+        self.daemon = False
+
+    def start(self):
+        pass
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    RecordingTimer.delays = []
+    monkeypatch.setattr(currency_service.threading, 'Timer', RecordingTimer)
+    return RecordingTimer.delays
+
+
+def test_unparseable_responses_back_the_probes_off(treasury_api, timers, make_rows):
+    treasury_api.rows = make_rows(currency_service.find_last_quarter_iso(), 10)
+    good_rates = business.get_currency_data()
+    treasury_api.body = b'{"not": "what we asked for"'
+    assert business.get_currency_data(refresh=True) is good_rates
+    assert business.is_serving_stale()
+    for _ in range(4):
+        currency_service._run_recovery_probe()
+    assert timers == [currency_service.MIN_PROBE_DELAY * 2 ** attempt for attempt in range(5)]
+
+
+def test_probe_delay_is_capped(treasury_api, timers, monkeypatch):
+    monkeypatch.setattr(currency_service, '_probe_attempts', 20)
+    with currency_service._stale_lock:
+        currency_service._schedule_recovery_probe()
+    assert timers == [currency_service.MAX_PROBE_DELAY]
+
+
+def test_recovered_api_resets_the_backoff(treasury_api, timers, make_rows):
+    treasury_api.rows = make_rows(currency_service.find_last_quarter_iso(), 10)
+    business.get_currency_data()
+    treasury_api.body = b'not json'
+    business.get_currency_data(refresh=True)
+    currency_service._run_recovery_probe()
+    treasury_api.body = None
+    currency_service._run_recovery_probe()
+    assert not business.is_serving_stale()
+    assert currency_service._probe_attempts == 0
+    assert len(timers) == 2
+
+
+def test_stale_rates_are_served_without_asking_again(treasury_api, timers, make_rows):
+    treasury_api.rows = make_rows(currency_service.find_last_quarter_iso(), 10)
+    good_rates = business.get_currency_data()
+    treasury_api.body = b'not json'
+    assert business.refresh_currency_data() is good_rates
+    request_count = len(treasury_api.requests)
+    for _ in range(3):
+        assert business.get_cached_currency_data() is good_rates
+    assert len(treasury_api.requests) == request_count
+    # only the probe asks again, and once it gets through the fresh rates are cached
+    treasury_api.body = None
+    currency_service._run_recovery_probe()
+    assert not business.is_serving_stale()
+    fresh_rates = business.get_cached_currency_data()
+    assert fresh_rates is not good_rates
+    assert len(fresh_rates) == 10
+
+
+def test_cache_lock_is_not_held_while_fetching(treasury_api, monkeypatch, make_rows):
+    fetching, release = threading.Event(), threading.Event()
+
+    def blocking_fetch(last_quarter_date, refresh):
+        fetching.set()
+        release.wait(5)
+        return business.build_currency_dict(make_rows(last_quarter_date.isoformat(), 10))
+    monkeypatch.setattr(currency_service, '_fetch_currency_data', blocking_fetch)
+    caller = threading.Thread(target=business.get_cached_currency_data)
+    caller.start()
+    try:
+        assert fetching.wait(5)
+        assert currency_service._currency_cache_lock.acquire(timeout=1)
+        currency_service._currency_cache_lock.release()
+    finally:
+        release.set()
+        caller.join(5)
+    assert len(business.get_cached_currency_data()) == 10
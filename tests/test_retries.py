@@ -0,0 +1,106 @@
+import io
+import pytest
+import requests
+import dal
+from dal import dal as dal_module
+
+
+class ScriptedAdapter(requests.adapters.BaseAdapter):
+    """
+    A transport adapter that plays back a script of outcomes (a status code, or an exception to raise) one per send,
+    remembering the timeout each send was given
+    """
+
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.raw = io.BytesIO(b'{"data": [], "meta": {"total-pages": 1}}')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(dal_module.time, 'sleep', delays.append)
+    # always the longest delay the backoff allows, so the schedule can be checked exactly
+    monkeypatch.setattr(dal_module.random, 'uniform', lambda low, high: high)
+    return delays
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    def mount(*outcomes):
+        adapter = ScriptedAdapter(outcomes)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        monkeypatch.setattr(dal_module, 'get_session', lambda: session)
+        monkeypatch.setattr(dal_module, 'treasury_breaker', dal.CircuitBreaker('Scripted API'))
+        dal.forget_validators()
+        return adapter
+    return mount
+
+
+def test_server_errors_are_retried_with_backoff(scripted, sleeps):
+    adapter = scripted(503, 502, 200)
+    assert dal.fetch_treasury_data('2023-09-30').status_code == 200
+    assert adapter.outcomes == []
+    assert sleeps == [dal_module.BACKOFF_BASE, dal_module.BACKOFF_BASE * 2]
+
+
+def test_retries_run_out(scripted, sleeps):
+    adapter = scripted(*[500] * (dal_module.MAX_RETRIES + 1))
+    # the last 5xx is handed back for the caller to report
+    assert dal.fetch_treasury_data('2023-09-30').status_code == 500
+    assert adapter.outcomes == []
+    assert len(sleeps) == dal_module.MAX_RETRIES
+
+
+def test_timeouts_are_retried_then_raised(scripted, sleeps):
+    adapter = scripted(*[requests.ReadTimeout('slow')] * (dal_module.MAX_RETRIES + 1))
+    with pytest.raises(dal.DalException):
+        dal.fetch_treasury_data('2023-09-30')
+    assert adapter.outcomes == []
+    assert len(sleeps) == dal_module.MAX_RETRIES
+
+
+def test_connection_error_then_success(scripted, sleeps):
+    adapter = scripted(requests.ConnectionError('reset'), 200)
+    assert dal.fetch_treasury_data('2023-09-30').status_code == 200
+    assert adapter.outcomes == []
+    assert sleeps == [dal_module.BACKOFF_BASE]
+
+
+def test_every_attempt_has_the_timeout(scripted, sleeps):
+    adapter = scripted(requests.ConnectTimeout('no route'), 504, 200)
+    dal.fetch_treasury_data('2023-09-30')
+    assert adapter.timeouts == [(dal_module.CONNECT_TIMEOUT, dal_module.READ_TIMEOUT)] * 3
+
+
+def test_client_errors_are_not_retried(scripted, sleeps):
+    adapter = scripted(404, 200)
+    assert dal.fetch_treasury_data('2023-09-30').status_code == 404
+    assert adapter.outcomes == [200]
+    assert sleeps == []
+
+
+def test_backoff_is_capped(sleeps):
+    assert [dal_module.backoff_delay(attempt) for attempt in range(1, 8)] == [0.5, 1, 2, 4, 8, 8, 8]
+
+
+def test_backoff_is_jittered(monkeypatch):
+    monkeypatch.setattr(dal_module.random, 'uniform', lambda low, high: low)
+    assert dal_module.backoff_delay(3) == 0
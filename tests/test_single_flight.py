@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+import business
+from business import async_currency_service, currency_service
+
+CALLERS = 8
+
+
+def wait_for_joiners(caplog, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while sum('already in flight' in record.getMessage() for record in caplog.records) < count:
+        assert time.monotonic() < deadline, "callers never joined the fetch in flight"
+        time.sleep(0.01)
+
+
+def test_concurrent_callers_share_one_fetch(treasury_api, monkeypatch, caplog):
+    release = threading.Event()
+    fetches = []
+
+    def blocking_fetch(last_quarter_date, refresh):
+        fetches.append(last_quarter_date)
+        release.wait(5)
+        return {'Euro Zone': 'rates'}
+    monkeypatch.setattr(currency_service, '_fetch_currency_data', blocking_fetch)
+    results = [None] * CALLERS
+
+    def call(index):
+        results[index] = business.get_currency_data()
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    wait_for_joiners(caplog, CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(fetches) == 1
+    assert all(result is results[0] for result in results)
+    assert not currency_service._in_flight
+
+
+def test_concurrent_coroutines_share_one_fetch(treasury_api, monkeypatch):
+    fetches = []
+
+    async def slow_fetch(last_quarter_date, session):
+        fetches.append(last_quarter_date)
+        await asyncio.sleep(0.05)
+        return {'Euro Zone': 'rates'}
+    monkeypatch.setattr(async_currency_service, '_fetch_currency_data_async', slow_fetch)
+
+    async def call_all():
+        return await asyncio.gather(*(business.get_currency_data_async() for _ in range(CALLERS)))
+    results = asyncio.run(call_all())
+    assert len(fetches) == 1
+    assert all(result is results[0] for result in results)
+    assert not async_currency_service._in_flight
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch(treasury_api, monkeypatch):
+    async def slow_fetch(last_quarter_date, session):
+        await asyncio.sleep(0.05)
+        return {'Euro Zone': 'rates'}
+    monkeypatch.setattr(async_currency_service, '_fetch_currency_data_async', slow_fetch)
+
+    async def cancel_one():
+        impatient = asyncio.ensure_future(business.get_currency_data_async())
+        patient = asyncio.ensure_future(business.get_currency_data_async())
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient
+    assert asyncio.run(cancel_one()) == {'Euro Zone': 'rates'}
@@ -0,0 +1,41 @@
+import json
+import pytest
+from business import iter_json_array
+
+DOCUMENT = json.dumps({'meta': {'data': [], 'count': 3}, 'links': None, 'total': 1.5,
+                       'data': [{'record_date': '2024-06-30', 'exchange_rate': '0.9'}, 1234, -5.5e3, 'x]", \\\\', True,
+                                [1, [2]], None],
+                       'after': {'data': ['not this one']}})
+ITEMS = json.loads(DOCUMENT)['data']
+
+
+def split_at(text, *offsets):
+    bounds = [0, *offsets, len(text)]
+    return [text[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+def test_only_the_top_level_array_is_walked():
+    assert list(iter_json_array(['{"meta":{"data":[]},"data":[{"a":1}]}'])) == [{'a': 1}]
+
+
+@pytest.mark.parametrize('offset', range(1, len(DOCUMENT)))
+def test_any_split_yields_the_same_items(offset):
+    assert list(iter_json_array(split_at(DOCUMENT, offset))) == ITEMS
+
+
+def test_one_character_chunks():
+    assert list(iter_json_array(DOCUMENT)) == ITEMS
+
+
+def test_numbers_split_across_chunks_stay_whole():
+    assert list(iter_json_array(['{"data":[12', '34]}'])) == [1234]
+
+
+def test_missing_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array(['{"meta": {"data": [1]}}']))
+
+
+def test_truncated_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array(['{"data": [{"a": 1}, {"a"']))